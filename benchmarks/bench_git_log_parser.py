@@ -0,0 +1,127 @@
+"""Throughput benchmark of the ``git log`` output parser.
+
+Generates a synthetic log in the format produced by ``GitProcess.log``
+and reports parsing speed in MB/s::
+
+    python benchmarks/bench_git_log_parser.py --size-mb 500
+    python benchmarks/bench_git_log_parser.py --size-mb 20 --compare
+
+``--compare`` also runs the former ``RE_COMMIT_LIST`` based parser on the
+same input. Keep the size small with it, the regex backtracks on long
+patches.
+"""
+import argparse
+import random
+import sys
+import time
+import typing as t
+
+from testbrain.contrib.scm.git.patterns import RE_COMMIT_LIST
+from testbrain.contrib.scm.git.utils import (
+    parse_commit_record,
+    parse_single_commit,
+    split_commit_records,
+)
+
+MB = 1024 * 1024
+
+
+def synthetic_commit(index: int, files: int, patch_lines: int) -> str:
+    sha = f"{index:040x}"
+    person = "Benchmark User\tbench@example.com\t2024-01-25T10:00:00+00:00"
+    lines = [
+        "",
+        f"COMMIT:\t{sha}",
+        f"TREE:\t{index + 1:040x}",
+        "DATE:\t2024-01-25T10:00:00+00:00",
+        f"AUTHOR:\t{person}",
+        f"COMMITTER:\t{person}",
+        f"MESSAGE:\tSynthetic commit {index}",
+        f"PARENTS:\t{index - 1:040x}",
+        "",
+    ]
+    for number in range(files):
+        lines.append(
+            f":100644 100644 {number:040x} {number + 1:040x} M\tsrc/file_{number}.py"
+        )
+    for number in range(files):
+        lines.append(f"{patch_lines}\t{patch_lines}\tsrc/file_{number}.py")
+    lines.append("")
+    for number in range(files):
+        lines.extend(
+            [
+                f"diff --git a/src/file_{number}.py b/src/file_{number}.py",
+                f"index {number:040x}..{number + 1:040x} 100644",
+                f"--- a/src/file_{number}.py",
+                f"+++ b/src/file_{number}.py",
+                f"@@ -1,{patch_lines} +1,{patch_lines} @@",
+            ]
+        )
+        for line in range(patch_lines):
+            lines.append(f"-    value_{line} = compute({line}, {number})")
+            lines.append(f"+    value_{line} = compute({line}, {number}, fast=True)")
+    return "\n".join(lines) + "\n"
+
+
+def synthetic_log(size: int, seed: int = 42) -> str:
+    rnd = random.Random(seed)
+    chunks: t.List[str] = []
+    total = 0
+    index = 1
+    while total < size:
+        chunk = synthetic_commit(
+            index, files=rnd.randint(1, 20), patch_lines=rnd.randint(1, 200)
+        )
+        chunks.append(chunk)
+        total += len(chunk)
+        index += 1
+    return "".join(chunks)
+
+
+def bench(name: str, size: int, func: t.Callable[[], int]) -> None:
+    started = time.perf_counter()
+    commits = func()
+    elapsed = time.perf_counter() - started
+    print(
+        f"{name:<24} {commits:>8} commits  {elapsed:8.2f} s  "
+        f"{size / MB / elapsed:8.1f} MB/s"
+    )
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=500)
+    parser.add_argument("--compare", action="store_true")
+    args = parser.parse_args(argv)
+
+    print(f"Generating {args.size_mb} MB synthetic log...")
+    text = synthetic_log(args.size_mb * MB)
+    size = len(text.encode("utf-8"))
+    print(f"Log size: {size / MB:.1f} MB")
+
+    def split_only() -> int:
+        count = 0
+        for record in split_commit_records(text):
+            parse_commit_record(record)
+            count += 1
+        return count
+
+    def full_parse() -> int:
+        count = 0
+        for record in split_commit_records(text):
+            parse_single_commit(parse_commit_record(record))
+            count += 1
+        return count
+
+    def regex_split() -> int:
+        return sum(1 for _ in RE_COMMIT_LIST.finditer(text))
+
+    bench("state machine (split)", size, split_only)
+    bench("state machine (parse)", size, full_parse)
+    if args.compare:
+        bench("RE_COMMIT_LIST (split)", size, regex_split)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
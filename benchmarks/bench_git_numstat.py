@@ -0,0 +1,114 @@
+"""Benchmark of ``parse_stats_from_text`` on one very wide commit.
+
+Builds the ``--numstat`` block of a commit touching ``--files`` files,
+like a vendored dependency bump with renames and binary files, and
+compares the bulk parser with the former per-line loop::
+
+    python benchmarks/bench_git_numstat.py --files 50000
+"""
+import argparse
+import sys
+import time
+import typing as t
+
+from testbrain.contrib.scm.git.utils import make_file_stats, parse_stats_from_text
+
+
+def synthetic_numstat(files: int) -> str:
+    lines = []
+    for number in range(files):
+        if number % 50 == 0:
+            lines.append(f"-\t-\tvendor/lib_{number}/logo.png")
+        elif number % 10 == 0:
+            lines.append(
+                f"{number % 7}\t{number % 3}\t"
+                f"vendor/{{lib_{number}-1.0 => lib_{number}-2.0}}/src/module.py"
+            )
+        else:
+            lines.append(
+                f"{number % 120}\t{number % 40}\tvendor/lib_{number // 100}"
+                f"/src/module_{number}.py"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def legacy_parse_stats_from_text(text: str) -> t.Dict:
+    hsh: t.Dict = {
+        "total": {
+            "additions": 0,
+            "insertions": 0,
+            "deletions": 0,
+            "changes": 0,
+            "lines": 0,
+            "files": 0,
+            "total": 0,
+        },
+        "files": {},
+    }
+
+    for line in text.splitlines():
+        (raw_insertions, raw_deletions, filename) = line.split("\t")
+
+        if "{" in filename:
+            root_path = filename[: filename.find("{")]
+            mid_path = (
+                filename[filename.find("{") + 1 : filename.find("}")]
+                .split("=>")[-1]
+                .strip()
+            )
+            end_path = filename[filename.find("}") + 1 :]
+            filename = root_path + mid_path + end_path
+            filename = filename.replace("//", "/")
+
+        if " => " in filename:
+            filename = filename.split(" => ")[1]
+
+        insertions = raw_insertions != "-" and int(raw_insertions) or 0
+        deletions = raw_deletions != "-" and int(raw_deletions) or 0
+
+        hsh["total"]["additions"] += insertions
+        hsh["total"]["insertions"] += insertions
+        hsh["total"]["deletions"] += deletions
+        hsh["total"]["changes"] += insertions + deletions
+        hsh["total"]["lines"] += insertions + deletions
+        hsh["total"]["total"] += insertions + deletions
+        hsh["total"]["files"] += 1
+
+        filename = filename.strip()
+
+        hsh["files"][filename] = make_file_stats(filename, insertions, deletions)
+    return hsh
+
+
+def bench(name: str, func: t.Callable[[], t.Any], repeat: int) -> t.Any:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:<16} {best * 1000:8.1f} ms")
+    return result
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    text = synthetic_numstat(args.files)
+    print(f"Numstat block: {args.files} files, {len(text) / 1024:.0f} KB")
+
+    bulk = bench("bulk", lambda: parse_stats_from_text(text), args.repeat)
+    legacy = bench(
+        "per-line loop", lambda: legacy_parse_stats_from_text(text), args.repeat
+    )
+    if bulk != legacy:
+        print("Results differ!")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
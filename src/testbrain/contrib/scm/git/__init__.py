@@ -1,3 +1,4 @@
+from .aio import AsyncGitVCS
 from .process import GitVCS
 
-__all__ = ["GitVCS"]
+__all__ = ["AsyncGitVCS", "GitVCS"]
@@ -0,0 +1,356 @@
+"""Asyncio git backend.
+
+:class:`AsyncGitProcess` and :class:`AsyncGitVCS` mirror the synchronous
+:class:`process.GitProcess` and :class:`process.GitVCS`, but every git call
+is a coroutine running on ``asyncio.create_subprocess_exec``. Many
+repositories can then be synced from one event loop::
+
+    async def sync(repo_dirs):
+        repos = [AsyncGitVCS(repo_dir) for repo_dir in repo_dirs]
+        await asyncio.gather(*(repo.fetch() for repo in repos))
+        return await asyncio.gather(*(repo.commits(number=100) for repo in repos))
+
+Commands are passed to git without a shell, so arguments are built
+unquoted.
+"""
+import logging
+import pathlib
+import typing as t
+
+from testbrain.contrib.terminal import AsyncProcess, ProcessExecutionError
+
+from ..exceptions import BranchNotFound, CommitNotFound, ProcessError
+from .process import PRETTY_FORMAT
+from .utils import (
+    CommitIndex,
+    PatchLimits,
+    make_parent_commit,
+    parse_commits_from_text,
+)
+
+logger = logging.getLogger(__name__)
+
+# Same effect as the rename settings GitVCS writes to the git config,
+# applied per command instead
+RENAME_CONFIG = ["-c", "diff.renames=0", "-c", "diff.renameLimit=999999"]
+
+
+class AsyncGitProcess(AsyncProcess):
+    async def remote_url(self) -> str:
+        try:
+            command = ["git", "config", "--get", "remote.origin.url"]
+            result = await self.execute(command=command)
+        except ProcessExecutionError as e:
+            logger.error(e.stderr)
+            logger.error(
+                f"Git repository {self.work_dir} does not have remote.origin.url set"
+            )
+            result = ""
+        return result
+
+    async def fetch(self, rev: t.Optional[str] = None) -> str:
+        params = []
+        if not rev:
+            params.append("-a")
+        else:
+            params.append(rev)
+
+        command = ["git", "fetch", *params]
+        try:
+            result = await self.execute(command=command)
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed fetch: {err_msg}")
+            raise ProcessError(f"Failed fetch: {err_msg}") from exc
+
+        return result
+
+    async def rev_parse(self, rev: str) -> str:
+        command = ["git", "rev-parse", rev]
+        try:
+            result = await self.execute(command=command)
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed rev-parse: {err_msg}")
+            raise ProcessError(f"Failed rev-parse: {err_msg}") from exc
+        return result
+
+    async def branch(
+        self,
+        local: t.Optional[bool] = False,
+        remote: t.Optional[bool] = False,
+        show_current: t.Optional[bool] = False,
+    ) -> str:
+        extra_params: list = []
+        if remote:
+            extra_params = ["-r"]
+        if local and remote:
+            extra_params = ["-a"]
+        if show_current:
+            extra_params = ["--show-current"]
+        command = ["git", "branch", *extra_params]
+        result = await self.execute(command=command)
+        return result
+
+    async def validate_commit(self, branch: str, commit: str) -> str:
+        command = ["git", "branch", "-a", "--contains", commit]
+        try:
+            result = await self.execute(command)
+        except ProcessExecutionError as exc:
+            raise ProcessError("Failed validate commit") from exc
+        if not any(line.endswith(branch) for line in result.splitlines()):
+            raise ProcessError("Failed validate commit")
+        return result
+
+    def _log_command(
+        self,
+        rev: str,
+        number: t.Optional[int],
+        reverse: t.Optional[bool] = True,
+        numstat: t.Optional[bool] = True,
+        raw: t.Optional[bool] = True,
+        patch: t.Optional[bool] = True,
+    ) -> t.List[str]:
+        params: list = []
+
+        if number is not None:
+            params.extend(["-n", str(number)])
+
+        params.extend(["--abbrev=40", "--full-diff", "--full-index"])
+
+        if reverse:
+            params.append("--reverse")
+
+        if raw:
+            params.append("--raw")
+
+        if numstat:
+            params.append("--numstat")
+
+        if patch:
+            params.append("-p")
+
+        return [
+            "git",
+            *RENAME_CONFIG,
+            "log",
+            *params,
+            f"--pretty=format:{PRETTY_FORMAT}",
+            str(rev),
+        ]
+
+    async def log(
+        self,
+        rev: str,
+        number: t.Optional[int],
+        reverse: t.Optional[bool] = True,
+        numstat: t.Optional[bool] = True,
+        raw: t.Optional[bool] = True,
+        patch: t.Optional[bool] = True,
+    ) -> str:
+        command = self._log_command(
+            rev=rev,
+            number=number,
+            reverse=reverse,
+            numstat=numstat,
+            raw=raw,
+            patch=patch,
+        )
+        try:
+            result = await self.execute(command=command)
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed get rev history: {err_msg}")
+            raise ProcessError(f"Failed get rev history: {err_msg}") from exc
+        return result
+
+    async def log_stream(
+        self,
+        rev: str,
+        number: t.Optional[int],
+        reverse: t.Optional[bool] = True,
+        numstat: t.Optional[bool] = True,
+        raw: t.Optional[bool] = True,
+        patch: t.Optional[bool] = True,
+    ) -> t.AsyncIterator[bytes]:
+        """Same as :meth:`log` but yields raw output lines as git prints them."""
+        command = self._log_command(
+            rev=rev,
+            number=number,
+            reverse=reverse,
+            numstat=numstat,
+            raw=raw,
+            patch=patch,
+        )
+        try:
+            async for line in self.stream(command=command):
+                yield line
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed get rev history: {err_msg}")
+            raise ProcessError(f"Failed get rev history: {err_msg}") from exc
+
+    async def log_headers(self, revs: t.List[str]) -> str:
+        """Headers of the given commits, revisions git does not know are skipped."""
+        command = [
+            "git",
+            "log",
+            "--no-walk=unsorted",
+            "--stdin",
+            "--ignore-missing",
+            "--abbrev=40",
+            f"--pretty=format:{PRETTY_FORMAT}",
+        ]
+        stdin = "".join(f"{rev}\n" for rev in revs)
+        try:
+            result = await self.execute(command=command, input=stdin.encode("utf-8"))
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed get commits: {err_msg}")
+            raise ProcessError(f"Failed get commits: {err_msg}") from exc
+        return result
+
+    async def ls_files(self, rev: str) -> str:
+        logger.debug(f"Get files tree for rev: {repr(rev)}")
+        params: list = ["--name-only", "-r", rev]
+
+        command = ["git", "ls-tree", *params]
+        try:
+            result = await self.execute(command=command)
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed get file list: {err_msg}")
+            raise ProcessError(f"Failed get file list: {err_msg}") from exc
+        return result
+
+
+class AsyncGitVCS(object):
+    """Coroutine version of the main :class:`process.GitVCS` operations.
+
+    Unlike GitVCS it does not write rename limits to the git config, the
+    log commands pass the same settings with ``-c``. Submodules, the commit
+    cache and lazy patches are only available through GitVCS.
+    """
+
+    _process: t.Optional["AsyncGitProcess"] = None
+
+    def __init__(
+        self,
+        repo_dir: t.Optional[t.Union[pathlib.Path, str]] = None,
+        repo_name: t.Optional[str] = None,
+    ):
+        if repo_dir is None:
+            repo_dir = pathlib.Path(".").resolve()
+
+        self._repo_dir = pathlib.Path(repo_dir).resolve()
+        self._repo_name = repo_name
+
+    @property
+    def repo_dir(self) -> pathlib.Path:
+        return self._repo_dir
+
+    @property
+    def process(self) -> "AsyncGitProcess":
+        if self._process is None:
+            self._process = AsyncGitProcess(self.repo_dir)
+        return self._process
+
+    async def get_repo_name(self) -> str:
+        if self._repo_name is None:
+            result = await self.process.remote_url()
+            remote_url = result.replace(".git", "")
+            if not remote_url:
+                remote_url = self.repo_dir.as_posix()
+            self._repo_name = remote_url.split("/")[-1]
+        return self._repo_name
+
+    async def get_current_branch(self) -> t.Optional[str]:
+        logger.debug("Get current active branch from git")
+        result = await self.process.branch(show_current=True)
+        if result == "":
+            result = None
+        logger.debug(f"Current active branch '{result}'")
+        return result
+
+    async def get_branch(self, branch_name: str) -> t.Tuple[str, str, bool]:
+        branches = await self.process.branch(local=True, remote=True)
+        branches = [record.replace("*", "").strip() for record in branches.splitlines()]
+        if branch_name in branches:
+            _branch, _remote = branch_name, False
+        elif f"remotes/origin/{branch_name}" in branches:
+            _branch, _remote = f"origin/{branch_name}", True
+        else:
+            raise BranchNotFound(f"Branch '{branch_name}' not found")
+
+        branch_sha = await self.process.rev_parse(rev=_branch)
+        return _branch, branch_sha, _remote
+
+    async def validate_commit(self, branch: str, commit: str) -> bool:
+        try:
+            _ = await self.process.validate_commit(branch=branch, commit=commit)
+            return True
+        except ProcessError as exc:
+            raise CommitNotFound(
+                f"Commit '{commit}' not found in '{branch}' history"
+            ) from exc
+
+    async def fetch(self, branch: t.Optional[str] = None) -> bool:
+        logger.debug("Fetch git history")
+        _ = await self.process.fetch(rev=branch)
+        return True
+
+    async def commits(
+        self,
+        commit: str = "HEAD",
+        number: t.Optional[int] = 1,
+        reverse: t.Optional[bool] = True,
+        numstat: t.Optional[bool] = True,
+        raw: t.Optional[bool] = True,
+        patch: t.Optional[bool] = True,
+        max_patch_size: t.Optional[int] = None,
+        max_commit_patch_size: t.Optional[int] = None,
+        skip_binary_patches: t.Optional[bool] = False,
+    ) -> CommitIndex:
+        """Same result as :meth:`process.GitVCS.commits`."""
+        limits = PatchLimits(
+            max_file_size=max_patch_size,
+            max_commit_size=max_commit_patch_size,
+            skip_binary=bool(skip_binary_patches),
+        )
+        result = await self.process.log(
+            rev=commit,
+            number=number,
+            reverse=reverse,
+            numstat=numstat,
+            raw=raw,
+            patch=patch,
+        )
+        commits = parse_commits_from_text(result, limits=limits)
+
+        known = {commit["sha"]: commit for commit in commits}
+        missing = []
+        for parsed_commit in commits:
+            for parent in parsed_commit["parents"]:
+                sha = parent["sha"]
+                if sha not in known and sha not in missing:
+                    missing.append(sha)
+        if missing:
+            # Parents outside the window; absent objects (shallow clones)
+            # are skipped as GitVCS does
+            headers = await self.process.log_headers(revs=missing)
+            known.update(
+                (header["sha"], header) for header in parse_commits_from_text(headers)
+            )
+
+        parent_commits = {sha: make_parent_commit(c) for sha, c in known.items()}
+        for parsed_commit in commits:
+            parsed_commit["parents"] = [
+                parent_commits[parent["sha"]]
+                for parent in parsed_commit["parents"]
+                if parent["sha"] in parent_commits
+            ]
+        return commits
+
+    async def file_tree(self, branch: t.Optional[str] = None) -> t.List[str]:
+        result = await self.process.ls_files(rev=branch or "HEAD")
+        return [file.strip() for file in result.splitlines()]
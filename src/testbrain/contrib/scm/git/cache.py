@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import typing as t
+import zlib
+
+if t.TYPE_CHECKING:
+    from .utils import PatchLimits
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = "testbrain"
+CACHE_FILE_NAME = "commits.sqlite"
+SYNC_STATE_FILE_NAME = "sync.json"
+DEFAULT_MAX_SIZE = 128 * 1024 * 1024
+
+# Bump when the layout of parsed commits changes, stale entries are dropped.
+SCHEMA_VERSION = 1
+
+
+def cache_variant(
+    numstat: t.Optional[bool] = True,
+    raw: t.Optional[bool] = True,
+    patch: t.Optional[bool] = True,
+    limits: t.Optional["PatchLimits"] = None,
+) -> str:
+    """Cache key suffix, the parsed result depends on the requested diffs."""
+    variant = "".join(
+        flag if enabled else "-"
+        for flag, enabled in (("n", numstat), ("r", raw), ("p", patch))
+    )
+    if patch and limits is not None and limits.enabled:
+        variant += (
+            f":{limits.max_file_size}:{limits.max_commit_size}"
+            f":{int(limits.skip_binary)}"
+        )
+    return variant
+
+
+class CommitCache(object):
+    """Content-addressed store of parsed commits.
+
+    Commits are immutable, so the output of ``parse_single_commit`` is
+    stored by SHA (and the requested diff variant) in a SQLite database,
+    by default ``.git/testbrain/commits.sqlite``. When the stored data
+    grows above ``max_size`` bytes the least recently used entries are
+    evicted.
+
+    Cache failures are logged and treated as misses, they never break
+    the caller.
+    """
+
+    def __init__(
+        self,
+        path: t.Union[pathlib.Path, str],
+        max_size: int = DEFAULT_MAX_SIZE,
+    ):
+        self.path = pathlib.Path(path)
+        self.max_size = max_size
+        self._conn: t.Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_git_dir(
+        cls, git_dir: t.Union[pathlib.Path, str], max_size: int = DEFAULT_MAX_SIZE
+    ) -> "CommitCache":
+        path = pathlib.Path(git_dir) / CACHE_DIR_NAME / CACHE_FILE_NAME
+        return cls(path, max_size=max_size)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                logger.debug(f"Reset commit cache {self.path}: schema {version}")
+                conn.execute("DROP TABLE IF EXISTS commits")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS commits ("
+                "sha TEXT NOT NULL, "
+                "variant TEXT NOT NULL, "
+                "data BLOB NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "accessed REAL NOT NULL, "
+                "PRIMARY KEY (sha, variant))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS commits_accessed ON commits (accessed)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, shas: t.Iterable[str], variant: str) -> t.Dict[str, t.Dict]:
+        shas = list(shas)
+        found: t.Dict[str, t.Dict] = {}
+        try:
+            with self._lock, self.conn as conn:
+                # Stay below SQLITE_MAX_VARIABLE_NUMBER
+                for start in range(0, len(shas), 500):
+                    chunk = shas[start : start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT sha, data FROM commits "
+                        f"WHERE variant = ? AND sha IN ({placeholders})",
+                        [variant, *chunk],
+                    ).fetchall()
+                    for sha, data in rows:
+                        found[sha] = json.loads(zlib.decompress(data))
+                    conn.executemany(
+                        "UPDATE commits SET accessed = ? "
+                        "WHERE sha = ? AND variant = ?",
+                        [(time.time(), sha, variant) for sha, _ in rows],
+                    )
+        except (sqlite3.Error, ValueError, zlib.error) as exc:
+            logger.warning(f"Commit cache read failed: {exc}")
+            return {}
+        logger.debug(f"Commit cache hits: {len(found)} of {len(shas)}")
+        return found
+
+    def put_many(self, commits: t.Iterable[t.Dict], variant: str) -> None:
+        rows = []
+        now = time.time()
+        for commit in commits:
+            data = zlib.compress(json.dumps(commit).encode("utf-8"))
+            rows.append((commit["sha"], variant, data, len(data), now))
+        if not rows:
+            return
+        try:
+            with self._lock, self.conn as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO commits "
+                    "(sha, variant, data, size, accessed) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._evict(conn)
+        except sqlite3.Error as exc:
+            logger.warning(f"Commit cache write failed: {exc}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM commits").fetchone()[0]
+        if total <= self.max_size:
+            return
+        excess = total - self.max_size
+        freed = 0
+        stale = []
+        for sha, variant, size in conn.execute(
+            "SELECT sha, variant, size FROM commits ORDER BY accessed"
+        ):
+            if freed >= excess:
+                break
+            stale.append((sha, variant))
+            freed += size
+        conn.executemany("DELETE FROM commits WHERE sha = ? AND variant = ?", stale)
+        logger.debug(f"Commit cache evicted {len(stale)} entries ({freed} bytes)")
+
+    def size(self) -> int:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM commits"
+            ).fetchone()
+        return row[0]
+
+    def clear(self) -> None:
+        with self._lock, self.conn as conn:
+            conn.execute("DELETE FROM commits")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class SyncState(object):
+    """Small JSON key-value store of sync progress.
+
+    Keeps the last synced commit per branch in ``.git/testbrain/sync.json``,
+    the Git counterpart of the TFVC changeset database.
+    """
+
+    def __init__(self, path: t.Union[pathlib.Path, str]):
+        self.path = pathlib.Path(path)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_git_dir(cls, git_dir: t.Union[pathlib.Path, str]) -> "SyncState":
+        return cls(pathlib.Path(git_dir) / CACHE_DIR_NAME / SYNC_STATE_FILE_NAME)
+
+    def load(self) -> t.Dict[str, t.Any]:
+        try:
+            with self.path.open("r", encoding="utf-8") as fd:
+                return json.load(fd)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Failed read sync state {self.path}: {exc}")
+            return {}
+
+    def get(self, key: str) -> t.Optional[t.Any]:
+        return self.load().get(key)
+
+    def set(self, key: str, value: t.Any) -> None:
+        with self._lock:
+            data = self.load()
+            data[key] = value
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix(".tmp")
+            with temp_path.open("w", encoding="utf-8") as fd:
+                json.dump(data, fd, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
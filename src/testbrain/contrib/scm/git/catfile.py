@@ -0,0 +1,215 @@
+import datetime
+import logging
+import os
+import pathlib
+import subprocess
+import threading
+import typing as t
+
+from ..exceptions import ProcessError
+
+logger = logging.getLogger(__name__)
+
+
+class GitObject(t.NamedTuple):
+    sha: str
+    type: str
+    size: int
+    data: t.Optional[bytes] = None
+
+
+class TreeEntry(t.NamedTuple):
+    mode: str
+    name: str
+    sha: str
+
+
+def parse_signature(text: str) -> t.Dict:
+    """Parse ``Name <email> 1695993225 +0300`` into the log person format."""
+    name, _, rest = text.partition(" <")
+    email, _, rest = rest.partition("> ")
+    timestamp, _, offset = rest.partition(" ")
+    sign = -1 if offset.startswith("-") else 1
+    offset = offset.lstrip("+-").rjust(4, "0")
+    tz = datetime.timezone(
+        sign * datetime.timedelta(hours=int(offset[:2]), minutes=int(offset[2:4]))
+    )
+    date = datetime.datetime.fromtimestamp(int(timestamp), tz=tz)
+    return dict(name=name, email=email, date=date.isoformat())
+
+
+def parse_commit_object(sha: str, data: bytes) -> t.Dict:
+    """Convert a raw commit object into the header-only commit dict.
+
+    Produces the same fields as ``git log`` with ``PRETTY_FORMAT`` and no
+    diff output: ISO dates (``%aI``) and the subject line (``%s``).
+    """
+    header, _, body = data.partition(b"\n\n")
+    encoding = "utf-8"
+    headers: t.List[t.Tuple[str, str]] = []
+    for line in header.split(b"\n"):
+        if line.startswith(b" "):
+            # Continuation of a multi-line header (gpgsig, mergetag)
+            continue
+        key, _, value = line.partition(b" ")
+        if key == b"encoding":
+            encoding = value.decode("ascii", errors="ignore") or encoding
+        headers.append((key.decode("ascii", errors="ignore"), value))
+
+    tree = ""
+    parents: t.List[str] = []
+    author: t.Dict = {}
+    committer: t.Dict = {}
+    for key, value in headers:
+        if key == "tree":
+            tree = value.decode("ascii")
+        elif key == "parent":
+            parents.append(value.decode("ascii"))
+        elif key == "author":
+            author = parse_signature(value.decode(encoding, errors="ignore"))
+        elif key == "committer":
+            committer = parse_signature(value.decode(encoding, errors="ignore"))
+
+    message = body.decode(encoding, errors="ignore")
+    subject = " ".join(
+        line.strip() for line in message.strip().split("\n\n", 1)[0].splitlines()
+    )
+
+    return dict(
+        sha=sha,
+        tree=tree,
+        date=author.get("date"),
+        author=author,
+        committer=committer,
+        message=subject,
+        parents=[dict(sha=parent) for parent in parents],
+        files=[],
+    )
+
+
+def parse_tree_object(data: bytes) -> t.List[TreeEntry]:
+    entries: t.List[TreeEntry] = []
+    position = 0
+    size = len(data)
+    while position < size:
+        space = data.index(b" ", position)
+        nul = data.index(b"\x00", space)
+        mode = data[position:space].decode("ascii")
+        name = data[space + 1 : nul].decode("utf-8", errors="surrogateescape")
+        sha = data[nul + 1 : nul + 21].hex()
+        entries.append(TreeEntry(mode=mode, name=name, sha=sha))
+        position = nul + 21
+    return entries
+
+
+class GitCatFile(object):
+    """Long-lived ``git cat-file --batch``/``--batch-check`` co-processes.
+
+    Object lookups are written to the stdin of an already running git and
+    answered over its stdout, so each lookup costs a pipe round trip
+    instead of a fork/exec. Processes are started on first use and live
+    until :meth:`close`.
+    """
+
+    def __init__(
+        self,
+        work_dir: pathlib.Path,
+        env: t.Optional[t.Mapping[str, str]] = None,
+    ):
+        self.work_dir = work_dir
+        self.env = env if env is not None else os.environ
+        self._batch: t.Optional[subprocess.Popen] = None
+        self._batch_check: t.Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "GitCatFile":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _spawn(self, mode: str) -> subprocess.Popen:
+        command = ["git", "cat-file", mode]
+        logger.debug(f"Start co-process {' '.join(command)}")
+        try:
+            return subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                cwd=self.work_dir,
+                env=self.env,
+            )
+        except OSError as exc:
+            logger.critical(f"Failed start git cat-file: {exc}")
+            raise ProcessError(f"Failed start git cat-file: {exc}") from exc
+
+    def _request(self, proc: subprocess.Popen, rev: str) -> t.Optional[t.List[str]]:
+        try:
+            proc.stdin.write(f"{rev}\n".encode("utf-8"))
+            proc.stdin.flush()
+            header = proc.stdout.readline()
+        except (BrokenPipeError, ValueError) as exc:
+            raise ProcessError(f"git cat-file terminated: {exc}") from exc
+        if not header:
+            raise ProcessError("git cat-file terminated unexpectedly")
+        fields = header.decode("utf-8", errors="ignore").split()
+        if len(fields) != 3:
+            # "<rev> missing" or "<rev> ambiguous"
+            logger.debug(f"Object lookup failed: {header!r}")
+            return None
+        return fields
+
+    def info(self, rev: str) -> t.Optional[GitObject]:
+        """Type and size of an object, None if it does not exist."""
+        with self._lock:
+            if self._batch_check is None:
+                self._batch_check = self._spawn("--batch-check")
+            fields = self._request(self._batch_check, rev)
+        if fields is None:
+            return None
+        sha, obj_type, size = fields
+        return GitObject(sha=sha, type=obj_type, size=int(size))
+
+    def read(self, rev: str) -> t.Optional[GitObject]:
+        """Type, size and contents of an object, None if it does not exist."""
+        with self._lock:
+            if self._batch is None:
+                self._batch = self._spawn("--batch")
+            fields = self._request(self._batch, rev)
+            if fields is None:
+                return None
+            sha, obj_type, size = fields
+            data = self._batch.stdout.read(int(size) + 1)[:-1]
+        return GitObject(sha=sha, type=obj_type, size=int(size), data=data)
+
+    def commit(self, rev: str) -> t.Optional[t.Dict]:
+        obj = self.read(rev)
+        if obj is None or obj.type != "commit":
+            return None
+        return parse_commit_object(obj.sha, obj.data)
+
+    def tree_entries(self, rev: str) -> t.List[TreeEntry]:
+        """Entries of a tree, or of the root tree of a commit."""
+        obj = self.read(f"{rev}^{{tree}}")
+        if obj is None:
+            raise ProcessError(f"Failed read tree: {rev}")
+        return parse_tree_object(obj.data)
+
+    def blob_size(self, rev: str, path: t.Optional[str] = None) -> t.Optional[int]:
+        obj = self.info(f"{rev}:{path}" if path is not None else rev)
+        return obj.size if obj is not None else None
+
+    def close(self) -> None:
+        with self._lock:
+            for proc in (self._batch, self._batch_check):
+                if proc is None:
+                    continue
+                try:
+                    proc.stdin.close()
+                    proc.wait(timeout=5)
+                except (OSError, subprocess.TimeoutExpired):
+                    proc.kill()
+                    proc.wait()
+            self._batch = None
+            self._batch_check = None
@@ -0,0 +1,88 @@
+import logging
+import typing as t
+
+from .utils import PatchLimits, parse_patches_from_diff_tree
+
+if t.TYPE_CHECKING:
+    from .process import GitProcess
+
+logger = logging.getLogger(__name__)
+
+
+class LazyPatchFile(dict):
+    """Commit file entry whose ``patch`` is fetched on first access.
+
+    The ``patch`` key is absent until loaded: ``file["patch"]`` and
+    ``file.get("patch")`` ask the shared :class:`PatchLoader`, which fills
+    every pending file of every pending commit in one git call. Serialize
+    commits only after the patches are loaded, ``json`` reads the dict
+    directly and would skip the field; :func:`load_patches` does that.
+    """
+
+    __slots__ = ("_loader",)
+
+    def __init__(self, *args, loader: "PatchLoader", **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loader = loader
+
+    def __missing__(self, key: str):
+        if key == "patch" and self._loader is not None:
+            self._loader.load()
+            return super().__getitem__(key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: t.Any = None) -> t.Any:
+        if key == "patch" and key not in self and self._loader is not None:
+            self._loader.load()
+        return super().get(key, default)
+
+    def __reduce__(self):
+        # Copies and pickles are plain dicts with the patch loaded
+        self.get("patch")
+        return dict, (dict(self),)
+
+
+class PatchLoader(object):
+    """Fetch patches of many commits with one ``git diff-tree -p`` call."""
+
+    def __init__(self, process: "GitProcess", limits: t.Optional[PatchLimits] = None):
+        self.process = process
+        self.limits = limits
+        self._pending: t.Dict[str, t.List[LazyPatchFile]] = {}
+
+    def attach(self, commits: t.Iterable[t.Dict]) -> None:
+        """Replace the files of ``commits`` with lazily patched entries."""
+        for commit in commits:
+            files = []
+            for commit_file in commit["files"]:
+                lazy_file = LazyPatchFile(commit_file, loader=self)
+                lazy_file.pop("patch", None)
+                files.append(lazy_file)
+            commit["files"] = files
+            if files:
+                self._pending.setdefault(commit["sha"], []).extend(files)
+
+    def load(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        logger.debug(f"Load patches of {len(pending)} commits")
+        result = self.process.diff_tree_patches(revs=list(pending))
+        patches = parse_patches_from_diff_tree(result, shas=pending, limits=self.limits)
+        for sha, files in pending.items():
+            commit_patches = patches.get(sha, {})
+            for lazy_file in files:
+                dict.__setitem__(
+                    lazy_file,
+                    "patch",
+                    commit_patches.get(lazy_file["filename"], ""),
+                )
+                lazy_file._loader = None
+
+
+def load_patches(commits: t.Iterable[t.Dict]) -> None:
+    """Resolve every lazy patch of ``commits``."""
+    for commit in commits:
+        for commit_file in commit["files"]:
+            if isinstance(commit_file, LazyPatchFile):
+                commit_file.get("patch")
@@ -0,0 +1,554 @@
+"""Read-only access to the git object database without spawning git.
+
+Supports loose objects, version 2 pack indexes with their packs (including
+offset and reference deltas), alternates, loose and packed refs. Anything
+else - SHA-256 repositories, reftable refs, objects missing because of a
+partial clone, revision expressions - raises :class:`ObjectStoreError`
+so the caller can fall back to the git CLI.
+"""
+import collections
+import logging
+import mmap
+import os
+import pathlib
+import re
+import struct
+import threading
+import typing as t
+import zlib
+
+logger = logging.getLogger(__name__)
+
+OBJ_COMMIT = 1
+OBJ_TREE = 2
+OBJ_BLOB = 3
+OBJ_TAG = 4
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+
+TYPE_NAMES = {
+    OBJ_COMMIT: "commit",
+    OBJ_TREE: "tree",
+    OBJ_BLOB: "blob",
+    OBJ_TAG: "tag",
+}
+
+TYPE_CODES = {name: code for code, name in TYPE_NAMES.items()}
+
+MODE_TREE = b"40000"
+
+RE_FULL_SHA = re.compile(r"^[0-9a-f]{40}$")
+
+RE_NEEDS_QUOTE = re.compile(rb'[\x00-\x1f"\\\x7f-\xff]')
+
+RE_NEEDS_QUOTE_ASCII = re.compile(rb'[\x00-\x1f"\\\x7f]')
+
+QUOTE_ESCAPES = {
+    0x07: "\\a",
+    0x08: "\\b",
+    0x09: "\\t",
+    0x0A: "\\n",
+    0x0B: "\\v",
+    0x0C: "\\f",
+    0x0D: "\\r",
+    0x22: '\\"',
+    0x5C: "\\\\",
+}
+
+DELTA_CACHE_SIZE = 256
+DECOMPRESS_CHUNK = 64 * 1024
+
+
+class ObjectStoreError(Exception):
+    """The object store cannot answer, use the git CLI instead."""
+
+
+class ObjectNotFound(ObjectStoreError):
+    ...
+
+
+def quote_path(name: bytes, quote_non_ascii: bool = True) -> str:
+    """Quote a path the way ``git ls-tree`` prints it (``quote_c_style``)."""
+    pattern = RE_NEEDS_QUOTE if quote_non_ascii else RE_NEEDS_QUOTE_ASCII
+    if pattern.search(name) is None:
+        return name.decode("utf-8", errors="ignore")
+
+    quoted = bytearray(b'"')
+    for byte in name:
+        if byte in QUOTE_ESCAPES:
+            quoted += QUOTE_ESCAPES[byte].encode("ascii")
+        elif byte < 0x20 or byte == 0x7F or (byte >= 0x80 and quote_non_ascii):
+            quoted += b"\\%03o" % byte
+        else:
+            quoted.append(byte)
+    quoted += b'"'
+    return quoted.decode("utf-8", errors="ignore")
+
+
+def read_config_value(
+    paths: t.Iterable[pathlib.Path], section: str, key: str
+) -> t.Optional[str]:
+    """Last value of ``section.key`` in plain git config files.
+
+    Only ``[section]`` headers and ``key = value`` lines are understood,
+    which covers the core settings the object store looks at.
+    """
+    value = None
+    for path in paths:
+        try:
+            lines = path.read_text(encoding="utf-8", errors="ignore").splitlines()
+        except OSError:
+            continue
+        current = None
+        for line in lines:
+            line = line.strip()
+            if not line or line[0] in "#;":
+                continue
+            if line.startswith("["):
+                current = line[1:].split("]", 1)[0].split(" ", 1)[0].lower()
+                continue
+            if current != section:
+                continue
+            name, _, raw_value = line.partition("=")
+            if name.strip().lower() == key:
+                value = raw_value.split("#", 1)[0].split(";", 1)[0].strip().strip('"')
+    return value
+
+
+def find_git_dir(work_dir: pathlib.Path) -> t.Optional[pathlib.Path]:
+    """The ``.git`` directory of the work tree containing ``work_dir``."""
+    for directory in (work_dir, *work_dir.parents):
+        dot_git = directory / ".git"
+        if dot_git.is_dir():
+            return dot_git
+        if dot_git.is_file():
+            content = dot_git.read_text(encoding="utf-8", errors="ignore").strip()
+            if content.startswith("gitdir:"):
+                git_dir = pathlib.Path(content[len("gitdir:") :].strip())
+                return (directory / git_dir).resolve()
+            return None
+    return None
+
+
+def read_varint(data: t.Union[bytes, memoryview], position: int) -> t.Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, position
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    source_size, position = read_varint(delta, 0)
+    target_size, position = read_varint(delta, position)
+    if source_size != len(base):
+        raise ObjectStoreError("Delta base size mismatch")
+
+    result = bytearray()
+    delta_size = len(delta)
+    while position < delta_size:
+        opcode = delta[position]
+        position += 1
+        if opcode & 0x80:
+            offset = 0
+            size = 0
+            for bit in range(4):
+                if opcode & (1 << bit):
+                    offset |= delta[position] << (8 * bit)
+                    position += 1
+            for bit in range(3):
+                if opcode & (0x10 << bit):
+                    size |= delta[position] << (8 * bit)
+                    position += 1
+            if size == 0:
+                size = 0x10000
+            result += base[offset : offset + size]
+        elif opcode:
+            result += delta[position : position + opcode]
+            position += opcode
+        else:
+            raise ObjectStoreError("Invalid delta opcode")
+
+    if len(result) != target_size:
+        raise ObjectStoreError("Delta target size mismatch")
+    return bytes(result)
+
+
+def _map_file(path: pathlib.Path) -> mmap.mmap:
+    with path.open("rb") as fd:
+        return mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PackIndex(object):
+    """Version 2 ``.idx`` file mapped into memory."""
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self._data = _map_file(path)
+        if self._data[:4] != b"\xfftOc" or self._data[4:8] != b"\x00\x00\x00\x02":
+            self._data.close()
+            raise ObjectStoreError(f"Unsupported pack index: {path}")
+        self._fanout = struct.unpack_from(">256I", self._data, 8)
+        self.count = self._fanout[255]
+        self._sha_table = 8 + 256 * 4
+        self._offset_table = self._sha_table + self.count * (20 + 4)
+        self._large_offset_table = self._offset_table + self.count * 4
+
+    def find(self, binsha: bytes) -> t.Optional[int]:
+        first = binsha[0]
+        low = self._fanout[first - 1] if first else 0
+        high = self._fanout[first]
+        data = self._data
+        table = self._sha_table
+        while low < high:
+            middle = (low + high) // 2
+            position = table + middle * 20
+            current = data[position : position + 20]
+            if current < binsha:
+                low = middle + 1
+            elif current > binsha:
+                high = middle
+            else:
+                return self._offset(middle)
+        return None
+
+    def _offset(self, index: int) -> int:
+        (offset,) = struct.unpack_from(">I", self._data, self._offset_table + index * 4)
+        if offset & 0x80000000:
+            large_index = offset & 0x7FFFFFFF
+            (offset,) = struct.unpack_from(
+                ">Q", self._data, self._large_offset_table + large_index * 8
+            )
+        return offset
+
+    def close(self) -> None:
+        self._data.close()
+
+
+class Pack(object):
+    def __init__(self, index_path: pathlib.Path):
+        self.index = PackIndex(index_path)
+        self.path = index_path.with_suffix(".pack")
+        self._data: t.Optional[mmap.mmap] = None
+        self._cache: "collections.OrderedDict[int, t.Tuple[int, bytes]]" = (
+            collections.OrderedDict()
+        )
+
+    @property
+    def data(self) -> mmap.mmap:
+        if self._data is None:
+            self._data = _map_file(self.path)
+            if self._data[:4] != b"PACK":
+                raise ObjectStoreError(f"Broken pack file: {self.path}")
+        return self._data
+
+    def _decompress(self, position: int, size: int) -> bytes:
+        data = self.data
+        decompressor = zlib.decompressobj()
+        chunks = []
+        # Compressed data is rarely larger than the object itself
+        chunk_size = size + 64
+        try:
+            while not decompressor.eof:
+                chunk = data[position : position + chunk_size]
+                if not chunk:
+                    raise ObjectStoreError(f"Truncated pack file: {self.path}")
+                chunks.append(decompressor.decompress(chunk))
+                position += len(chunk)
+                chunk_size = DECOMPRESS_CHUNK
+        except zlib.error as exc:
+            raise ObjectStoreError(f"Broken pack object: {exc}") from exc
+        return b"".join(chunks)
+
+    def read_at(self, offset: int, store: "ObjectStore") -> t.Tuple[int, bytes]:
+        cached = self._cache.get(offset)
+        if cached is not None:
+            self._cache.move_to_end(offset)
+            return cached
+
+        data = self.data
+        byte = data[offset]
+        position = offset + 1
+        obj_type = (byte >> 4) & 0x07
+        size = byte & 0x0F
+        shift = 4
+        while byte & 0x80:
+            byte = data[position]
+            position += 1
+            size |= (byte & 0x7F) << shift
+            shift += 7
+
+        if obj_type == OBJ_OFS_DELTA:
+            byte = data[position]
+            position += 1
+            distance = byte & 0x7F
+            while byte & 0x80:
+                byte = data[position]
+                position += 1
+                distance = ((distance + 1) << 7) | (byte & 0x7F)
+            base_type, base = self.read_at(offset - distance, store)
+            result = (base_type, apply_delta(base, self._decompress(position, size)))
+        elif obj_type == OBJ_REF_DELTA:
+            base_sha = data[position : position + 20].hex()
+            position += 20
+            base_type_name, base = store.read(base_sha)
+            base_type = TYPE_CODES[base_type_name]
+            result = (base_type, apply_delta(base, self._decompress(position, size)))
+        elif obj_type in TYPE_NAMES:
+            result = (obj_type, self._decompress(position, size))
+        else:
+            raise ObjectStoreError(f"Unknown pack object type {obj_type}")
+
+        self._cache[offset] = result
+        if len(self._cache) > DELTA_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return result
+
+    def close(self) -> None:
+        self.index.close()
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        self._cache.clear()
+
+
+class ObjectStore(object):
+    """Pure Python reader of a repository object database and refs.
+
+    >>> store = ObjectStore(pathlib.Path(".git"))
+    >>> store.ls_tree_names("HEAD")[:2]
+    ['.gitignore', 'README.md']
+    """
+
+    def __init__(self, git_dir: pathlib.Path):
+        self.git_dir = pathlib.Path(git_dir)
+        common_dir_file = self.git_dir / "commondir"
+        if common_dir_file.is_file():
+            common_dir = common_dir_file.read_text(encoding="utf-8").strip()
+            self.common_dir = (self.git_dir / common_dir).resolve()
+        else:
+            self.common_dir = self.git_dir
+
+        config_paths = [
+            pathlib.Path(os.path.expanduser("~/.gitconfig")),
+            pathlib.Path(
+                os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config"))
+            )
+            / "git"
+            / "config",
+            self.common_dir / "config",
+        ]
+        object_format = read_config_value(
+            [self.common_dir / "config"], "extensions", "objectformat"
+        )
+        if object_format not in (None, "sha1"):
+            raise ObjectStoreError(f"Unsupported object format: {object_format}")
+        if (self.common_dir / "reftable").exists():
+            raise ObjectStoreError("Unsupported reftable ref storage")
+
+        quote_path_value = read_config_value(config_paths, "core", "quotepath")
+        self.quote_non_ascii = (quote_path_value or "true").lower() not in (
+            "false",
+            "no",
+            "off",
+            "0",
+        )
+
+        self.object_dirs = [self.common_dir / "objects"]
+        self.object_dirs.extend(self._alternates(self.object_dirs[0]))
+        self._packs: t.Optional[t.List[Pack]] = None
+        self._packed_refs: t.Optional[t.Dict[str, str]] = None
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> "ObjectStore":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @staticmethod
+    def _alternates(objects_dir: pathlib.Path) -> t.List[pathlib.Path]:
+        alternates_file = objects_dir / "info" / "alternates"
+        if not alternates_file.is_file():
+            return []
+        alternates = []
+        for line in alternates_file.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                alternates.append((objects_dir / line).resolve())
+        return alternates
+
+    @property
+    def packs(self) -> t.List[Pack]:
+        if self._packs is None:
+            packs = []
+            for objects_dir in self.object_dirs:
+                for index_path in sorted((objects_dir / "pack").glob("pack-*.idx")):
+                    if index_path.stat().st_size == 0:
+                        continue
+                    packs.append(Pack(index_path))
+            self._packs = packs
+        return self._packs
+
+    def _read_loose(self, sha: str) -> t.Optional[t.Tuple[str, bytes]]:
+        for objects_dir in self.object_dirs:
+            path = objects_dir / sha[:2] / sha[2:]
+            try:
+                raw = zlib.decompress(path.read_bytes())
+            except FileNotFoundError:
+                continue
+            except zlib.error as exc:
+                raise ObjectStoreError(f"Broken loose object {sha}: {exc}") from exc
+            header, _, data = raw.partition(b"\x00")
+            obj_type, _, _ = header.partition(b" ")
+            return obj_type.decode("ascii"), data
+        return None
+
+    def read(self, sha: str) -> t.Tuple[str, bytes]:
+        """Type name and contents of an object."""
+        with self._lock:
+            try:
+                binsha = bytes.fromhex(sha)
+                for pack in self.packs:
+                    offset = pack.index.find(binsha)
+                    if offset is not None:
+                        obj_type, data = pack.read_at(offset, self)
+                        return TYPE_NAMES[obj_type], data
+            except (IndexError, ValueError, struct.error) as exc:
+                # Truncated or corrupt pack data
+                raise ObjectStoreError(f"Failed read object {sha}: {exc}") from exc
+            loose = self._read_loose(sha)
+            if loose is not None:
+                return loose
+        raise ObjectNotFound(f"Object {sha} not found")
+
+    @property
+    def packed_refs(self) -> t.Dict[str, str]:
+        if self._packed_refs is None:
+            refs = {}
+            path = self.common_dir / "packed-refs"
+            if path.is_file():
+                for line in path.read_text(encoding="utf-8").splitlines():
+                    if not line or line[0] in "#^":
+                        continue
+                    sha, _, name = line.partition(" ")
+                    refs[name.strip()] = sha
+            self._packed_refs = refs
+        return self._packed_refs
+
+    def _read_ref(self, name: str, depth: int = 0) -> t.Optional[str]:
+        if depth > 5:
+            raise ObjectStoreError(f"Symbolic ref loop at {name}")
+        for base in (self.git_dir, self.common_dir):
+            path = base / name
+            if path.is_file():
+                value = path.read_text(encoding="utf-8").strip()
+                if value.startswith("ref:"):
+                    return self._read_ref(value[4:].strip(), depth + 1)
+                if RE_FULL_SHA.match(value):
+                    return value
+        return self.packed_refs.get(name)
+
+    def resolve(self, rev: str) -> str:
+        """SHA of a full SHA, ``HEAD`` or a ref name, as ``git rev-parse``."""
+        if RE_FULL_SHA.match(rev):
+            return rev
+        if any(char in rev for char in "~^:@{}*?[\\ ") or ".." in rev:
+            raise ObjectStoreError(f"Unsupported revision: {rev}")
+        for name in (
+            rev,
+            f"refs/{rev}",
+            f"refs/tags/{rev}",
+            f"refs/heads/{rev}",
+            f"refs/remotes/{rev}",
+            f"refs/remotes/{rev}/HEAD",
+        ):
+            sha = self._read_ref(name)
+            if sha is not None:
+                return sha
+        raise ObjectStoreError(f"Unknown revision: {rev}")
+
+    def tree_sha(self, rev: str) -> str:
+        """Root tree of the commit (or annotated tag) ``rev`` points to."""
+        sha = self.resolve(rev)
+        for _ in range(10):
+            obj_type, data = self.read(sha)
+            if obj_type == "tree":
+                return sha
+            if obj_type == "commit":
+                if not data.startswith(b"tree "):
+                    raise ObjectStoreError(f"Broken commit {sha}")
+                return data[5:45].decode("ascii")
+            if obj_type == "tag":
+                if not data.startswith(b"object "):
+                    raise ObjectStoreError(f"Broken tag {sha}")
+                sha = data[7:47].decode("ascii")
+                continue
+            raise ObjectStoreError(f"{rev} is a {obj_type}, not a tree-ish")
+        raise ObjectStoreError(f"Tag chain too long at {rev}")
+
+    def iter_tree(
+        self, tree_sha: str, prefix: bytes = b""
+    ) -> t.Iterator[t.Tuple[bytes, bytes, str]]:
+        """Recursive ``(mode, path, sha)`` entries in ``git ls-tree -r`` order."""
+        obj_type, data = self.read(tree_sha)
+        if obj_type != "tree":
+            raise ObjectStoreError(f"{tree_sha} is a {obj_type}, not a tree")
+        position = 0
+        size = len(data)
+        while position < size:
+            space = data.index(b" ", position)
+            nul = data.index(b"\x00", space)
+            mode = data[position:space]
+            path = prefix + data[space + 1 : nul]
+            sha = data[nul + 1 : nul + 21].hex()
+            position = nul + 21
+            if mode == MODE_TREE:
+                yield from self.iter_tree(sha, prefix=path + b"/")
+            else:
+                yield mode, path, sha
+
+    def ls_tree_names(self, rev: str) -> t.List[str]:
+        """Same lines as ``git ls-tree --name-only -r <rev>``."""
+        return [
+            quote_path(path, quote_non_ascii=self.quote_non_ascii)
+            for _, path, _ in self.iter_tree(self.tree_sha(rev))
+        ]
+
+    def blob_id(self, rev: str, path: str) -> t.Optional[str]:
+        """SHA of the blob at ``path`` in ``rev``, None if there is none."""
+        sha = self.tree_sha(rev)
+        parts = path.strip("/").encode("utf-8").split(b"/")
+        for depth, part in enumerate(parts):
+            obj_type, data = self.read(sha)
+            if obj_type != "tree":
+                return None
+            entry = self._find_entry(data, part)
+            if entry is None:
+                return None
+            mode, sha = entry
+            if depth == len(parts) - 1:
+                return sha if mode != MODE_TREE else None
+        return None
+
+    @staticmethod
+    def _find_entry(data: bytes, name: bytes) -> t.Optional[t.Tuple[bytes, str]]:
+        position = 0
+        size = len(data)
+        while position < size:
+            space = data.index(b" ", position)
+            nul = data.index(b"\x00", space)
+            if data[space + 1 : nul] == name:
+                return data[position:space], data[nul + 1 : nul + 21].hex()
+            position = nul + 21
+        return None
+
+    def close(self) -> None:
+        with self._lock:
+            for pack in self._packs or []:
+                pack.close()
+            self._packs = None
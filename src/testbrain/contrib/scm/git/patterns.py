@@ -55,7 +55,7 @@ RE_COMMIT_LIST = re.compile(
     r"AUTHOR:\s(?P<author>.+?\t.+?\t.+?)\n"
     r"COMMITTER:\s(?P<committer>.+?\t.+?\t.+?)\n"
     r"MESSAGE:\s(?P<message>.+)\n"
-    r"PARENTS:\s?(?P<parents>[0-9A-Fa-f]+(?:\s[0-9A-Fa-f]+)*)?\n{1,2}"
+    r"PARENTS:\s?(?P<parents>[0-9A-Fa-f]+(?:\s[0-9A-Fa-f]+)*)?(?:\n{1,2}|\Z)"
     r"(?P<raw>(?:^:.+\n)+)?"
     r"(?P<numstats>(?:\d+\t\d+\t.+\n)+)?(?:\n{1,2})?"
     r"(?P<patch>(?:(?!^COMMIT:).*\n?)+)?",
@@ -70,3 +70,17 @@ RE_SUBMODULE_FILES_PATTERN = re.compile(
     r"^Entering\s'(?P<path>[^']+)'\n(?P<files>(?:(?!^Entering).*\n?)*)",
     re.MULTILINE,
 )
+
+RE_SHA_LINE = re.compile(r"^[0-9a-f]{40}$", re.MULTILINE)
+
+# "{old => new}" part of a numstat rename path, e.g. "src/{a => b}/main.py"
+RE_NUMSTAT_RENAME = re.compile(r"([^{}]*)\{([^}]*)\}(.*)", re.DOTALL)
+
+# Lines of a "diff --git" header block, matched one line at a time by
+# scan_patch_headers with the same captures as RE_COMMIT_DIFF
+RE_DIFF_HEADER_PATHS = re.compile(r'("?[ab]/.+?"?) ("?[ab]/.+?"?)')
+RE_DIFF_NEW_FILE_MODE = re.compile(r"new file mode (.+)")
+RE_DIFF_DELETED_FILE_MODE = re.compile(r"deleted file mode (.+)")
+RE_DIFF_INDEX = re.compile(r"index ([0-9A-Fa-f]+)\.\.([0-9A-Fa-f]+) ?(.+)?")
+RE_DIFF_A_PATH = re.compile(r"--- ([^\t\n\r\f\v]*)[\t\r\f\v]*")
+RE_DIFF_B_PATH = re.compile(r"\+\+\+ ([^\t\n\r\f\v]*)[\t\r\f\v]*")
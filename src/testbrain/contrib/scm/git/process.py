@@ -1,3 +1,4 @@
+import concurrent.futures
 import logging
 import pathlib
 import re
@@ -7,16 +8,65 @@ from testbrain.contrib.terminal import Process, ProcessExecutionError
 
 from ..base import AbstractVCS
 from ..exceptions import BranchNotFound, CommitNotFound, ProcessError
+from .cache import CommitCache, SyncState, cache_variant
+from .catfile import GitCatFile
+from .lazy import PatchLoader
+from .odb import ObjectStore, ObjectStoreError, find_git_dir
+from .records import Commit, commits_to_records
 from .utils import (
-    find_commit_by_sha,
+    CommitIndex,
+    PatchLimits,
+    make_parent_commit,
+    parse_commits_from_bytes,
+    parse_commits_from_lines,
     parse_commits_from_text,
-    parse_files_foreach_submodules,
 )
 
 logger = logging.getLogger(__name__)
 
+T = t.TypeVar("T")
+
+_TAB = "%x09"
+
+PRETTY_FORMAT = (
+    "%n"
+    f"COMMIT:{_TAB}%H%n"
+    f"TREE:{_TAB}%T%n"
+    f"DATE:{_TAB}%aI%n"
+    f"AUTHOR:{_TAB}%an{_TAB}%ae{_TAB}%aI%n"
+    f"COMMITTER:{_TAB}%cn{_TAB}%ce{_TAB}%cI%n"
+    f"MESSAGE:{_TAB}%s%n"
+    f"PARENTS:{_TAB}%P%n"
+)
+
+
+_NUL = "%x00"
+
+# Used with -z: every field is NUL terminated and records start with
+# NUL NUL COMMIT NUL, see utils.parse_commits_from_bytes
+PRETTY_FORMAT_Z = (
+    f"{_NUL}{_NUL}COMMIT{_NUL}"
+    f"%H{_NUL}%T{_NUL}%aI{_NUL}"
+    f"%an{_NUL}%ae{_NUL}%aI{_NUL}"
+    f"%cn{_NUL}%ce{_NUL}%cI{_NUL}"
+    f"%s{_NUL}%P{_NUL}"
+)
+
 
 class GitProcess(Process):
+    _cat_file: t.Optional["GitCatFile"] = None
+
+    @property
+    def cat_file(self) -> "GitCatFile":
+        if self._cat_file is None:
+            self._cat_file = GitCatFile(self.work_dir, env=self.env)
+        return self._cat_file
+
+    def close(self) -> None:
+        if self._cat_file is not None:
+            self._cat_file.close()
+            self._cat_file = None
+
     def remote_url(self) -> str:
         try:
             command = ["git", "config", "--get", "remote.origin.url"]
@@ -100,21 +150,25 @@ class GitProcess(Process):
             raise ProcessError("Failed validate commit") from exc
         return result
 
-    def log(
+    def _log_command(
         self,
         rev: str,
-        number: int,
+        number: t.Optional[int],
         reverse: t.Optional[bool] = True,
         numstat: t.Optional[bool] = True,
         raw: t.Optional[bool] = True,
         patch: t.Optional[bool] = True,
-    ) -> str:
-        params: list = [
-            f"-n {number}",
-            "--abbrev=40",
-            "--full-diff",
-            "--full-index",
-        ]
+        nul_delimited: t.Optional[bool] = False,
+    ) -> t.List[str]:
+        params: list = []
+
+        if number is not None:
+            params.append(f"-n {number}")
+
+        params.extend(["--abbrev=40", "--full-diff", "--full-index"])
+
+        if nul_delimited:
+            params.append("-z")
 
         if reverse:
             params.append("--reverse")
@@ -128,17 +182,7 @@ class GitProcess(Process):
         if patch:
             params.append("-p")
 
-        tab = "%x09"
-        pretty_format = (
-            "%n"
-            f"COMMIT:{tab}%H%n"
-            f"TREE:{tab}%T%n"
-            f"DATE:{tab}%aI%n"
-            f"AUTHOR:{tab}%an{tab}%ae{tab}%aI%n"
-            f"COMMITTER:{tab}%cn{tab}%ce{tab}%cI%n"
-            f"MESSAGE:{tab}%s%n"
-            f"PARENTS:{tab}%P%n"
-        )
+        pretty_format = PRETTY_FORMAT_Z if nul_delimited else PRETTY_FORMAT
 
         command = [
             "git",
@@ -147,6 +191,25 @@ class GitProcess(Process):
             f'--pretty=format:"{pretty_format}"',
             str(rev),
         ]
+        return command
+
+    def log(
+        self,
+        rev: str,
+        number: t.Optional[int],
+        reverse: t.Optional[bool] = True,
+        numstat: t.Optional[bool] = True,
+        raw: t.Optional[bool] = True,
+        patch: t.Optional[bool] = True,
+    ) -> str:
+        command = self._log_command(
+            rev=rev,
+            number=number,
+            reverse=reverse,
+            numstat=numstat,
+            raw=raw,
+            patch=patch,
+        )
         try:
             result = self.execute(command=command)
         except ProcessExecutionError as exc:
@@ -155,6 +218,173 @@ class GitProcess(Process):
             raise ProcessError(f"Failed get rev history: {err_msg}") from exc
         return result
 
+    def log_stream(
+        self,
+        rev: str,
+        number: t.Optional[int],
+        reverse: t.Optional[bool] = True,
+        numstat: t.Optional[bool] = True,
+        raw: t.Optional[bool] = True,
+        patch: t.Optional[bool] = True,
+    ) -> t.Iterator[bytes]:
+        """Same as :meth:`log` but yields raw output lines as git prints them."""
+        command = self._log_command(
+            rev=rev,
+            number=number,
+            reverse=reverse,
+            numstat=numstat,
+            raw=raw,
+            patch=patch,
+        )
+        try:
+            yield from self.stream(command=command)
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed get rev history: {err_msg}")
+            raise ProcessError(f"Failed get rev history: {err_msg}") from exc
+
+    def log_z(
+        self,
+        rev: str,
+        number: t.Optional[int],
+        reverse: t.Optional[bool] = True,
+        numstat: t.Optional[bool] = True,
+        raw: t.Optional[bool] = True,
+        patch: t.Optional[bool] = True,
+    ) -> bytes:
+        """Machine readable variant of :meth:`log`.
+
+        Runs ``git log -z`` with NUL separated header fields and returns the
+        undecoded output for :func:`utils.parse_commits_from_bytes`.
+        """
+        command = self._log_command(
+            rev=rev,
+            number=number,
+            reverse=reverse,
+            numstat=numstat,
+            raw=raw,
+            patch=patch,
+            nul_delimited=True,
+        )
+        try:
+            result = b"".join(self.stream(command=command))
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed get rev history: {err_msg}")
+            raise ProcessError(f"Failed get rev history: {err_msg}") from exc
+        return result
+
+    def log_commits(
+        self,
+        revs: t.List[str],
+        numstat: t.Optional[bool] = False,
+        raw: t.Optional[bool] = False,
+        patch: t.Optional[bool] = False,
+    ) -> str:
+        """Print the given commits with a single git call.
+
+        Revisions are fed through stdin, so the command line stays short
+        regardless of how many commits are requested.
+        """
+        params: list = ["--no-walk=unsorted", "--stdin", "--abbrev=40"]
+
+        if numstat or raw or patch:
+            params.extend(["--full-diff", "--full-index"])
+
+        if raw:
+            params.append("--raw")
+
+        if numstat:
+            params.append("--numstat")
+
+        if patch:
+            params.append("-p")
+
+        command = [
+            "git",
+            "log",
+            *params,
+            f'--pretty=format:"{PRETTY_FORMAT}"',
+        ]
+        stdin = "".join(f"{rev}\n" for rev in revs)
+        try:
+            result = self.execute(command=command, input=stdin.encode("utf-8"))
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed get commits: {err_msg}")
+            raise ProcessError(f"Failed get commits: {err_msg}") from exc
+        return result
+
+    def diff_tree_patches(self, revs: t.List[str]) -> str:
+        """Patches of the given commits against their first parent.
+
+        Revisions are fed through stdin, each commit section of the output
+        starts with a line holding its SHA.
+        """
+        command = ["git", "diff-tree", "--stdin", "--root", "-p", "--full-index"]
+        stdin = "".join(f"{rev}\n" for rev in revs)
+        try:
+            result = self.execute(command=command, input=stdin.encode("utf-8"))
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed get patches: {err_msg}")
+            raise ProcessError(f"Failed get patches: {err_msg}") from exc
+        return result
+
+    def rev_list(
+        self, rev: str, number: t.Optional[int], reverse: t.Optional[bool] = True
+    ) -> t.List[str]:
+        """SHAs of the commits :meth:`log` would print, in the same order."""
+        params: list = []
+
+        if number is not None:
+            params.append(f"-n {number}")
+
+        if reverse:
+            params.append("--reverse")
+
+        command = ["git", "rev-list", *params, str(rev)]
+        try:
+            result = self.execute(command=command)
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed get rev list: {err_msg}")
+            raise ProcessError(f"Failed get rev list: {err_msg}") from exc
+        return result.split()
+
+    def git_dir(self) -> pathlib.Path:
+        command = ["git", "rev-parse", "--absolute-git-dir"]
+        try:
+            result = self.execute(command=command)
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed get git dir: {err_msg}")
+            raise ProcessError(f"Failed get git dir: {err_msg}") from exc
+        return pathlib.Path(result)
+
+    def submodule_paths(self) -> t.List[str]:
+        """Paths of the checked out submodules, in index order.
+
+        These are the submodules ``git submodule foreach`` visits: gitlink
+        entries of the index whose working directory is populated.
+        """
+        command = ["git", "ls-files", "--stage", "-z"]
+        try:
+            result = self.execute(command=command)
+        except ProcessExecutionError as exc:
+            err_msg = exc.stderr.splitlines()[0]
+            logger.critical(f"Failed get submodules: {err_msg}")
+            raise ProcessError(f"Failed get submodules: {err_msg}") from exc
+
+        paths = []
+        for entry in result.split("\0"):
+            if not entry.startswith("160000 "):
+                continue
+            path = entry.split("\t", 1)[1]
+            if (self.work_dir / path / ".git").exists():
+                paths.append(path)
+        return paths
+
     def ls_files(self, rev: str) -> str:
         logger.debug(f"Get files tree for rev: {repr(rev)}")
         params: list = ["--name-only", "-r", rev]
@@ -170,10 +400,14 @@ class GitProcess(Process):
 
 
 class GitSubmoduleProcess(Process):
-    def execute(self, command: t.Union[str, t.List[str]]) -> str:
+    def execute(
+        self,
+        command: t.Union[str, t.List[str]],
+        input: t.Optional[bytes] = None,
+    ) -> str:
         submodule_command = ["git", "submodule", "foreach"]
         submodule_command += command
-        return super().execute(command=submodule_command)
+        return super().execute(command=submodule_command, input=input)
 
     def log(
         self,
@@ -203,23 +437,11 @@ class GitSubmoduleProcess(Process):
         if patch:
             params.append("-p")
 
-        tab = "%x09"
-        pretty_format = (
-            "%n"
-            f"COMMIT:{tab}%H%n"
-            f"TREE:{tab}%T%n"
-            f"DATE:{tab}%aI%n"
-            f"AUTHOR:{tab}%an{tab}%ae{tab}%aI%n"
-            f"COMMITTER:{tab}%cn{tab}%ce{tab}%cI%n"
-            f"MESSAGE:{tab}%s%n"
-            f"PARENTS:{tab}%P%n"
-        )
-
         command = [
             "git",
             "log",
             *params,
-            f'--pretty=format:"{pretty_format}"',
+            f'--pretty=format:"{PRETTY_FORMAT}"',
             str(rev),
         ]
         try:
@@ -247,13 +469,21 @@ class GitSubmoduleProcess(Process):
 class GitVCS(AbstractVCS):
     _process: t.Optional["GitProcess"] = None
     _submodule_process: t.Optional["GitSubmoduleProcess"] = None
+    _commit_cache: t.Optional["CommitCache"] = None
+    _sync_state: t.Optional["SyncState"] = None
+    _object_store: t.Optional["ObjectStore"] = None
+    submodule_workers: int = 8
 
     def __init__(
         self,
         repo_dir: t.Optional[t.Union[pathlib.Path, str]] = None,
         repo_name: t.Optional[str] = None,
+        cache: t.Optional[bool] = False,
+        native_odb: t.Optional[bool] = False,
     ):
         super().__init__(repo_dir, repo_name)
+        self._cache_enabled = cache
+        self._native_odb_enabled = native_odb
         self._fix_renames()
 
     @property
@@ -268,6 +498,44 @@ class GitVCS(AbstractVCS):
             self._submodule_process = GitSubmoduleProcess(self.repo_dir)
         return self._submodule_process
 
+    @property
+    def commit_cache(self) -> t.Optional["CommitCache"]:
+        if self._commit_cache is None and self._cache_enabled:
+            self._commit_cache = CommitCache.for_git_dir(self.process.git_dir())
+        return self._commit_cache
+
+    @commit_cache.setter
+    def commit_cache(self, value: t.Optional["CommitCache"]) -> None:
+        self._commit_cache = value
+
+    @property
+    def object_store(self) -> t.Optional["ObjectStore"]:
+        """Pure Python object database reader, None when disabled or unusable."""
+        if self._object_store is None and self._native_odb_enabled:
+            git_dir = find_git_dir(self.repo_dir)
+            try:
+                if git_dir is None:
+                    raise ObjectStoreError(f"No git dir found for {self.repo_dir}")
+                self._object_store = ObjectStore(git_dir)
+            except (ObjectStoreError, OSError) as exc:
+                logger.debug(f"Native object database disabled: {exc}")
+                self._native_odb_enabled = False
+        return self._object_store
+
+    @property
+    def sync_state(self) -> "SyncState":
+        if self._sync_state is None:
+            self._sync_state = SyncState.for_git_dir(self.process.git_dir())
+        return self._sync_state
+
+    def get_last_commit_sha(self, branch: str) -> t.Optional[str]:
+        last_sha = self.sync_state.get(branch)
+        logger.debug(f"Last synced commit of {branch!r}: {last_sha}")
+        return last_sha
+
+    def set_last_commit_sha(self, branch: str, sha: str) -> None:
+        self.sync_state.set(branch, sha)
+
     def _fix_renames(self, limit: t.Optional[int] = 999999):
         try:
             self.process.execute(
@@ -287,6 +555,14 @@ class GitVCS(AbstractVCS):
         except ProcessExecutionError:
             logger.warning("Cant fix rename limits LOCAL")
 
+    def close(self) -> None:
+        if self._process is not None:
+            self._process.close()
+        if self._commit_cache is not None:
+            self._commit_cache.close()
+        if self._object_store is not None:
+            self._object_store.close()
+
     def _get_repo_name(self) -> str:
         result = self.process.remote_url()
         remote_url = result.replace(".git", "")
@@ -366,68 +642,343 @@ class GitVCS(AbstractVCS):
     def commits(
         self,
         commit: str = "HEAD",
-        number: int = 1,
+        number: t.Optional[int] = 1,
         reverse: t.Optional[bool] = True,
         numstat: t.Optional[bool] = True,
         raw: t.Optional[bool] = True,
         patch: t.Optional[bool] = True,
         submodules: t.Optional[bool] = False,
-    ) -> t.List[t.Dict]:
-        result = self.process.log(
-            rev=commit,
-            number=number,
-            reverse=reverse,
-            numstat=numstat,
-            raw=raw,
-            patch=patch,
+        nul_delimited: t.Optional[bool] = False,
+        lazy_patch: t.Optional[bool] = False,
+        records: t.Optional[bool] = False,
+        max_patch_size: t.Optional[int] = None,
+        max_commit_patch_size: t.Optional[int] = None,
+        skip_binary_patches: t.Optional[bool] = False,
+    ) -> t.Union[CommitIndex, t.List[Commit]]:
+        """Latest ``number`` commits reachable from ``commit``.
+
+        With ``lazy_patch`` the log is collected without patches and each
+        file ``patch`` is fetched on first access, for all returned commits
+        at once (see :class:`lazy.PatchLoader`).
+
+        With ``records`` compact :class:`records.Commit` objects are returned
+        instead of dicts, ``to_dict()`` gives back the dict payload. Lazy
+        patches are loaded by the conversion.
+
+        ``max_patch_size`` and ``max_commit_patch_size`` bound the UTF-8
+        size of a file patch and of all patches of a commit, and
+        ``skip_binary_patches`` drops binary patches. Patches over the
+        limits are replaced while parsing with a marker holding their size
+        (see :class:`utils.PatchLimits`).
+        """
+        limits = PatchLimits(
+            max_file_size=max_patch_size,
+            max_commit_size=max_commit_patch_size,
+            skip_binary=bool(skip_binary_patches),
         )
+        if lazy_patch:
+            patch = False
 
-        commits = parse_commits_from_text(result)
+        if self.commit_cache is not None:
+            commits = self._cached_commits(
+                commit=commit,
+                number=number,
+                reverse=reverse,
+                numstat=numstat,
+                raw=raw,
+                patch=patch,
+                limits=limits,
+            )
+        elif nul_delimited:
+            result = self.process.log_z(
+                rev=commit,
+                number=number,
+                reverse=reverse,
+                numstat=numstat,
+                raw=raw,
+                patch=patch,
+            )
+            commits = parse_commits_from_bytes(result, limits=limits)
+        else:
+            result = self.process.log(
+                rev=commit,
+                number=number,
+                reverse=reverse,
+                numstat=numstat,
+                raw=raw,
+                patch=patch,
+            )
+            commits = parse_commits_from_text(result, limits=limits)
+        self._link_parents(commits, self._parent_commits(commits))
 
-        for commit in commits:
-            parent_commits = commit["parents"].copy()
-            commit["parents"] = []
-            for parent in parent_commits:
-                parent_result = self.process.log(
-                    rev=parent["sha"],
-                    number=1,
-                    numstat=False,
-                    raw=False,
-                    patch=False,
-                )
-                parent_commit = parse_commits_from_text(parent_result)
-                commit["parents"].extend(parent_commit)
+        if lazy_patch:
+            PatchLoader(self.process, limits=limits).attach(commits)
 
         if submodules:
-            submodule_result = self.submodule_process.log(
-                reverse=reverse,
-                numstat=True,
-                raw=True,
-                patch=True,
+            submodule_results = self._foreach_submodule(
+                lambda process: process.log(
+                    rev="HEAD",
+                    number=100,
+                    reverse=reverse,
+                    numstat=True,
+                    raw=True,
+                    patch=True,
+                )
             )
-
-            submodule_commits = parse_commits_from_text(submodule_result)
+            # The text "git submodule foreach" prints, minus the headers
+            submodule_result = "\n\n".join(
+                result for path, result in submodule_results if result
+            )
+            submodule_commits = parse_commits_from_text(submodule_result, limits=limits)
 
             for submodule_commit in submodule_commits:
                 parent_commits = submodule_commit["parents"].copy()
                 submodule_commit["parents"] = []
                 for parent in parent_commits:
-                    parent_commit = find_commit_by_sha(submodule_commits, parent["sha"])
+                    parent_commit = submodule_commits.get(parent["sha"])
                     if parent_commit:
                         submodule_commit["parents"].append(parent_commit)
                 commits.append(submodule_commit)
+
+        if records:
+            return commits_to_records(commits)
         return commits
 
+    def commits_since(
+        self,
+        last_sha: t.Optional[str] = None,
+        head: str = "HEAD",
+        branch: t.Optional[str] = None,
+        number: t.Optional[int] = 1,
+        reverse: t.Optional[bool] = True,
+        numstat: t.Optional[bool] = True,
+        raw: t.Optional[bool] = True,
+        patch: t.Optional[bool] = True,
+        lazy_patch: t.Optional[bool] = False,
+        max_patch_size: t.Optional[int] = None,
+        max_commit_patch_size: t.Optional[int] = None,
+        skip_binary_patches: t.Optional[bool] = False,
+    ) -> CommitIndex:
+        """Commits reachable from ``head`` but not from ``last_sha``.
+
+        Reads the ``last_sha..head`` range, so the cost follows the number of
+        new commits. Without ``last_sha`` the last synced commit of ``branch``
+        (see :meth:`set_last_commit_sha`) is used. When neither is known, or
+        the commit no longer exists, the latest ``number`` commits are
+        returned as :meth:`commits` does. ``number`` is not applied to ranges.
+        """
+        if last_sha is None and branch is not None:
+            last_sha = self.get_last_commit_sha(branch)
+
+        if last_sha is not None and self.process.cat_file.info(last_sha) is None:
+            logger.warning(f"Last synced commit {last_sha} not found, full sync")
+            last_sha = None
+
+        if last_sha is None:
+            return self.commits(
+                commit=head,
+                number=number,
+                reverse=reverse,
+                numstat=numstat,
+                raw=raw,
+                patch=patch,
+                lazy_patch=lazy_patch,
+                max_patch_size=max_patch_size,
+                max_commit_patch_size=max_commit_patch_size,
+                skip_binary_patches=skip_binary_patches,
+            )
+
+        return self.commits(
+            commit=f"{last_sha}..{head}",
+            number=None,
+            reverse=reverse,
+            numstat=numstat,
+            raw=raw,
+            patch=patch,
+            lazy_patch=lazy_patch,
+            max_patch_size=max_patch_size,
+            max_commit_patch_size=max_commit_patch_size,
+            skip_binary_patches=skip_binary_patches,
+        )
+
+    def iter_commits(
+        self,
+        commit: str = "HEAD",
+        number: int = 1,
+        reverse: t.Optional[bool] = True,
+        numstat: t.Optional[bool] = True,
+        raw: t.Optional[bool] = True,
+        patch: t.Optional[bool] = True,
+        records: t.Optional[bool] = False,
+        max_patch_size: t.Optional[int] = None,
+        max_commit_patch_size: t.Optional[int] = None,
+        skip_binary_patches: t.Optional[bool] = False,
+    ) -> t.Iterator[t.Union[t.Dict, Commit]]:
+        """Yield the same commits as :meth:`commits` one at a time.
+
+        The log is read from the git pipe while it is produced, so peak
+        memory is bounded by the largest single commit instead of the whole
+        history window. Parents are resolved up front from a header-only log.
+        With ``records`` every commit is yielded as a :class:`records.Commit`,
+        parent headers are shared between them. Patch limits work as in
+        :meth:`commits`.
+        """
+        limits = PatchLimits(
+            max_file_size=max_patch_size,
+            max_commit_size=max_commit_patch_size,
+            skip_binary=bool(skip_binary_patches),
+        )
+        header_result = self.process.log(
+            rev=commit,
+            number=number,
+            reverse=reverse,
+            numstat=False,
+            raw=False,
+            patch=False,
+        )
+        parent_commits = self._parent_commits(parse_commits_from_text(header_result))
+
+        lines = self.process.log_stream(
+            rev=commit,
+            number=number,
+            reverse=reverse,
+            numstat=numstat,
+            raw=raw,
+            patch=patch,
+        )
+        memo: t.Dict[int, Commit] = {}
+        for parsed_commit in parse_commits_from_lines(lines, limits=limits):
+            self._link_parents([parsed_commit], parent_commits)
+            if records:
+                yield Commit.from_dict(parsed_commit, memo)
+            else:
+                yield parsed_commit
+
+    def _cached_commits(
+        self,
+        commit: str,
+        number: t.Optional[int],
+        reverse: t.Optional[bool] = True,
+        numstat: t.Optional[bool] = True,
+        raw: t.Optional[bool] = True,
+        patch: t.Optional[bool] = True,
+        limits: t.Optional[PatchLimits] = None,
+    ) -> CommitIndex:
+        """Same as the plain log path, but only parses unseen commits.
+
+        The commit window is listed with ``git rev-list``; commits missing
+        from :attr:`commit_cache` are printed with one ``git log --no-walk``
+        call, parsed and stored before the parents are linked.
+        """
+        variant = cache_variant(numstat=numstat, raw=raw, patch=patch, limits=limits)
+        shas = self.process.rev_list(rev=commit, number=number, reverse=reverse)
+        cached = self.commit_cache.get_many(shas, variant)
+
+        missing = [sha for sha in shas if sha not in cached]
+        if missing:
+            result = self.process.log_commits(
+                revs=missing, numstat=numstat, raw=raw, patch=patch
+            )
+            # Parse every commit as if another one followed it: the stored
+            # patch must not depend on the commit position in this output
+            parsed = parse_commits_from_text(result + "\n\n\n", limits=limits)
+            self.commit_cache.put_many(parsed, variant)
+            cached.update(
+                (parsed_commit["sha"], parsed_commit) for parsed_commit in parsed
+            )
+
+        return CommitIndex(cached[sha] for sha in shas if sha in cached)
+
+    def _parent_commits(self, commits: t.List[t.Dict]) -> t.Dict[str, t.Dict]:
+        """Collect metadata of every parent referenced by ``commits``.
+
+        Parents that are part of ``commits`` are taken as is, the rest are
+        read through the ``git cat-file --batch`` co-process. Parents whose
+        objects are absent (shallow clones) are skipped.
+        """
+        known = {commit["sha"]: commit for commit in commits}
+        missing = []
+        for commit in commits:
+            for parent in commit["parents"]:
+                sha = parent["sha"]
+                if sha not in known and sha not in missing:
+                    missing.append(sha)
+
+        for sha in missing:
+            parent_commit = self.process.cat_file.commit(sha)
+            if parent_commit is None:
+                logger.debug(f"Parent commit {sha} not found in object database")
+                continue
+            known[sha] = parent_commit
+
+        return {sha: make_parent_commit(commit) for sha, commit in known.items()}
+
+    @staticmethod
+    def _link_parents(
+        commits: t.Iterable[t.Dict], parent_commits: t.Dict[str, t.Dict]
+    ) -> None:
+        for commit in commits:
+            commit["parents"] = [
+                parent_commits[parent["sha"]]
+                for parent in commit["parents"]
+                if parent["sha"] in parent_commits
+            ]
+
     def file_tree(
         self, branch: t.Optional[str] = None, submodules: t.Optional[bool] = False
     ) -> t.Optional[t.List[str]]:
         if branch is None:
             branch = None
-        result = self.process.ls_files(rev=branch)
-        file_tree = result.splitlines()
+        file_tree = self._native_file_tree(branch) if branch is not None else None
+        if file_tree is None:
+            result = self.process.ls_files(rev=branch)
+            file_tree = result.splitlines()
         file_tree = [file.lstrip().rstrip() for file in file_tree]
         if submodules:
-            submodule_result = self.submodule_process.ls_files()
-            submodule_file_tree = parse_files_foreach_submodules(submodule_result)
-            file_tree.extend(submodule_file_tree)
+            submodule_results = self._foreach_submodule(
+                lambda process: process.ls_files(rev="HEAD")
+            )
+            for path, submodule_result in submodule_results:
+                for file in submodule_result.splitlines():
+                    file = file.strip()
+                    if file:
+                        file_tree.append(pathlib.Path(path).joinpath(file).as_posix())
         return file_tree
+
+    def _native_file_tree(self, branch: str) -> t.Optional[t.List[str]]:
+        """Read the tree of ``branch`` from the object database directly.
+
+        Returns None when the native reader is disabled or cannot answer
+        (objects missing in a partial clone, revision expressions, an
+        unsupported repository format), the caller then asks git.
+        """
+        store = self.object_store
+        if store is None:
+            return None
+        try:
+            return store.ls_tree_names(branch)
+        except (ObjectStoreError, OSError) as exc:
+            logger.debug(f"Native file tree of {branch!r} failed, use git: {exc}")
+            return None
+
+    def _foreach_submodule(
+        self, func: t.Callable[["GitProcess"], T]
+    ) -> t.List[t.Tuple[str, T]]:
+        """Run ``func`` against every checked out submodule concurrently.
+
+        Submodules are listed once and queried from a pool of at most
+        ``submodule_workers`` threads, each through its own
+        :class:`GitProcess`. Results are tagged with the submodule path and
+        returned in listing order, whatever order they complete in.
+        """
+        paths = self.process.submodule_paths()
+        if not paths:
+            return []
+
+        def run(path: str) -> T:
+            return func(GitProcess(self.repo_dir / path))
+
+        workers = min(self.submodule_workers, len(paths))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run, paths))
+        return list(zip(paths, results))
@@ -0,0 +1,261 @@
+"""Compact commit records.
+
+The parsers produce nested dicts, one ``FilesTD`` dict with eleven keys
+per changed file. For large histories the records below hold the same
+data in ``__slots__`` objects: status strings and repeated names are
+interned, and the duplicated counters (``additions``, ``changes``,
+``lines``) are derived from ``insertions`` and ``deletions`` on access.
+``to_dict()`` returns exactly the dict payload of the parsers.
+"""
+import sys
+import typing as t
+
+STATUS_ADDED = sys.intern("added")
+STATUS_DELETED = sys.intern("deleted")
+STATUS_MODIFIED = sys.intern("modified")
+STATUS_COPIED = sys.intern("copied")
+STATUS_RENAMED = sys.intern("renamed")
+STATUS_REMOVED = sys.intern("removed")
+STATUS_UNKNOWN = sys.intern("unknown")
+
+STATUSES = {
+    status: status
+    for status in (
+        STATUS_ADDED,
+        STATUS_DELETED,
+        STATUS_MODIFIED,
+        STATUS_COPIED,
+        STATUS_RENAMED,
+        STATUS_REMOVED,
+        STATUS_UNKNOWN,
+    )
+}
+
+
+def intern_status(status: t.Optional[str]) -> t.Optional[str]:
+    if status is None:
+        return None
+    return STATUSES.get(status) or sys.intern(status)
+
+
+def intern_text(value: t.Optional[str]) -> t.Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Person(object):
+    __slots__ = ("name", "email", "date")
+
+    def __init__(self, name: str, email: str, date: str):
+        self.name = intern_text(name)
+        self.email = intern_text(email)
+        self.date = date
+
+    def __repr__(self) -> str:
+        return f"<Person {self.name} <{self.email}>>"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Person):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    @classmethod
+    def from_dict(cls, data: t.Dict) -> "Person":
+        return cls(name=data["name"], email=data["email"], date=data["date"])
+
+    def to_dict(self) -> t.Dict:
+        return dict(name=self.name, email=self.email, date=self.date)
+
+
+class CommitFile(object):
+    __slots__ = (
+        "filename",
+        "sha",
+        "insertions",
+        "deletions",
+        "status",
+        "previous_filename",
+        "patch",
+        "blame",
+    )
+
+    def __init__(
+        self,
+        filename: str,
+        sha: t.Optional[str] = "",
+        insertions: int = 0,
+        deletions: int = 0,
+        status: t.Optional[str] = STATUS_UNKNOWN,
+        previous_filename: t.Optional[str] = "",
+        patch: t.Optional[str] = "",
+        blame: t.Optional[str] = "",
+    ):
+        self.filename = intern_text(filename)
+        self.sha = sha
+        self.insertions = insertions
+        self.deletions = deletions
+        self.status = intern_status(status)
+        self.previous_filename = intern_text(previous_filename)
+        self.patch = patch
+        self.blame = blame
+
+    def __repr__(self) -> str:
+        return f"<CommitFile {self.status} {self.filename}>"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CommitFile):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    @property
+    def additions(self) -> int:
+        return self.insertions
+
+    @property
+    def changes(self) -> int:
+        return self.insertions + self.deletions
+
+    @property
+    def lines(self) -> int:
+        return self.insertions + self.deletions
+
+    @classmethod
+    def from_dict(cls, data: t.Mapping) -> "CommitFile":
+        return cls(
+            filename=data["filename"],
+            sha=data["sha"],
+            insertions=data["insertions"],
+            deletions=data["deletions"],
+            status=data["status"],
+            previous_filename=data["previous_filename"],
+            patch=data.get("patch"),
+            blame=data["blame"],
+        )
+
+    def to_dict(self) -> t.Dict:
+        return dict(
+            filename=self.filename,
+            sha=self.sha,
+            additions=self.insertions,
+            insertions=self.insertions,
+            deletions=self.deletions,
+            changes=self.insertions + self.deletions,
+            lines=self.insertions + self.deletions,
+            status=self.status,
+            previous_filename=self.previous_filename,
+            patch=self.patch,
+            blame=self.blame,
+        )
+
+
+class Commit(object):
+    """One commit; ``parents`` holds SHAs until linked to header records."""
+
+    __slots__ = (
+        "sha",
+        "tree",
+        "date",
+        "author",
+        "committer",
+        "message",
+        "parents",
+        "files",
+    )
+
+    def __init__(
+        self,
+        sha: str,
+        tree: str,
+        date: str,
+        author: Person,
+        committer: Person,
+        message: str,
+        parents: t.Optional[t.List[t.Union[str, "Commit"]]] = None,
+        files: t.Optional[t.List[CommitFile]] = None,
+    ):
+        self.sha = sha
+        self.tree = tree
+        self.date = date
+        self.author = author
+        self.committer = committer
+        self.message = message
+        self.parents = parents if parents is not None else []
+        self.files = files if files is not None else []
+
+    def __repr__(self) -> str:
+        return f"<Commit {self.sha}>"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Commit):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    @property
+    def parent_shas(self) -> t.List[str]:
+        return [
+            parent.sha if isinstance(parent, Commit) else parent
+            for parent in self.parents
+        ]
+
+    def header(self) -> "Commit":
+        """Copy without files and with unlinked parents, as used in ``parents``."""
+        return Commit(
+            sha=self.sha,
+            tree=self.tree,
+            date=self.date,
+            author=self.author,
+            committer=self.committer,
+            message=self.message,
+            parents=self.parent_shas,
+        )
+
+    @classmethod
+    def from_dict(
+        cls, data: t.Mapping, _memo: t.Optional[t.Dict[int, "Commit"]] = None
+    ) -> "Commit":
+        """Build a record from a parsed commit dict.
+
+        Linked parents become header records; a parent dict shared by
+        several commits is converted once when the same ``_memo`` is passed.
+        """
+        if _memo is None:
+            _memo = {}
+        parents: t.List[t.Union[str, Commit]] = []
+        for parent in data["parents"]:
+            if len(parent) == 1:
+                parents.append(parent["sha"])
+                continue
+            record = _memo.get(id(parent))
+            if record is None:
+                record = _memo[id(parent)] = cls.from_dict(parent, _memo)
+            parents.append(record)
+        return cls(
+            sha=data["sha"],
+            tree=data["tree"],
+            date=data["date"],
+            author=Person.from_dict(data["author"]),
+            committer=Person.from_dict(data["committer"]),
+            message=data["message"],
+            parents=parents,
+            files=[CommitFile.from_dict(file) for file in data["files"]],
+        )
+
+    def to_dict(self) -> t.Dict:
+        return dict(
+            sha=self.sha,
+            tree=self.tree,
+            date=self.date,
+            author=self.author.to_dict(),
+            committer=self.committer.to_dict(),
+            message=self.message,
+            parents=[
+                parent.to_dict() if isinstance(parent, Commit) else dict(sha=parent)
+                for parent in self.parents
+            ],
+            files=[commit_file.to_dict() for commit_file in self.files],
+        )
+
+
+def commits_to_records(commits: t.Iterable[t.Mapping]) -> t.List[Commit]:
+    """Convert parsed commit dicts, keeping shared parents shared."""
+    memo: t.Dict[int, Commit] = {}
+    return [Commit.from_dict(commit, memo) for commit in commits]
@@ -0,0 +1,195 @@
+import concurrent.futures
+import logging
+import os
+import pathlib
+import threading
+import time
+import typing as t
+
+from testbrain.contrib.terminal import ProcessExecutionError
+
+from ..exceptions import SCMError
+from .process import GitVCS
+from .utils import CommitIndex, PatchLimits, parse_commits_from_text
+
+logger = logging.getLogger(__name__)
+
+STAGE_FETCH = "fetch"
+STAGE_COMMITS = "commits"
+STAGE_PARSE = "parse"
+STAGE_FILE_TREE = "file_tree"
+
+DEFAULT_STAGE_LIMITS = {
+    STAGE_FETCH: 4,
+    STAGE_COMMITS: 8,
+    STAGE_PARSE: os.cpu_count() or 1,
+    STAGE_FILE_TREE: 8,
+}
+
+# Logs below this size are parsed in the worker thread, shipping them to
+# another process would cost more than the parsing
+DEFAULT_PARSE_POOL_THRESHOLD = 1024 * 1024
+
+
+class SyncJob(t.NamedTuple):
+    repo_dir: t.Union[pathlib.Path, str]
+    branch: str
+    number: t.Optional[int] = 100
+
+
+class SyncResult(t.NamedTuple):
+    job: SyncJob
+    commits: t.Optional[CommitIndex]
+    file_tree: t.Optional[t.List[str]]
+    timings: t.Dict[str, float]
+    error: t.Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class SyncScheduler(object):
+    """Sync many repositories concurrently.
+
+    Every job runs the fetch → commits → file_tree pipeline of
+    :class:`process.GitVCS` for one ``(repo_dir, branch)`` pair. Git calls
+    run in a thread pool, parsing of large logs in a process pool, and
+    each stage admits at most ``stage_limits[stage]`` jobs at a time, so
+    a slow remote cannot hold every worker in ``fetch`` while the CPU
+    idles. Jobs fail independently, the error is kept in their
+    :class:`SyncResult` together with the seconds spent in each stage.
+    """
+
+    def __init__(
+        self,
+        stage_limits: t.Optional[t.Dict[str, int]] = None,
+        fetch: t.Optional[bool] = True,
+        limits: t.Optional[PatchLimits] = None,
+        parse_pool_threshold: int = DEFAULT_PARSE_POOL_THRESHOLD,
+    ):
+        self.stage_limits = dict(DEFAULT_STAGE_LIMITS)
+        if stage_limits:
+            self.stage_limits.update(stage_limits)
+        self.fetch = fetch
+        self.limits = limits
+        self.parse_pool_threshold = parse_pool_threshold
+        self._semaphores = {
+            stage: threading.BoundedSemaphore(limit)
+            for stage, limit in self.stage_limits.items()
+        }
+        self._parse_pool: t.Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def run(self, jobs: t.Iterable[t.Union[SyncJob, t.Tuple]]) -> t.List[SyncResult]:
+        """Sync every job and return the results in job order."""
+        jobs = [job if isinstance(job, SyncJob) else SyncJob(*job) for job in jobs]
+        if not jobs:
+            return []
+
+        # Enough threads for every git stage to be saturated at once
+        workers = min(
+            len(jobs),
+            self.stage_limits[STAGE_FETCH]
+            + self.stage_limits[STAGE_COMMITS]
+            + self.stage_limits[STAGE_FILE_TREE],
+        )
+        started = time.perf_counter()
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self._run_job, jobs))
+        finally:
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown()
+                self._parse_pool = None
+        failed = sum(1 for result in results if not result.ok)
+        logger.info(
+            f"Synced {len(results)} repositories in "
+            f"{time.perf_counter() - started:.2f}s, {failed} failed"
+        )
+        return results
+
+    def _stage(self, stage: str, timings: t.Dict[str, float]) -> "_Stage":
+        return _Stage(stage, self._semaphores[stage], timings)
+
+    def _run_job(self, job: SyncJob) -> SyncResult:
+        timings: t.Dict[str, float] = {}
+        commits = None
+        file_tree = None
+        error = None
+        started = time.perf_counter()
+        vcs = GitVCS(repo_dir=job.repo_dir)
+        try:
+            if self.fetch:
+                with self._stage(STAGE_FETCH, timings):
+                    vcs.fetch(branch=job.branch)
+
+            with self._stage(STAGE_COMMITS, timings):
+                branch_name, _, _ = vcs.get_branch(job.branch)
+                result = vcs.process.log(rev=branch_name, number=job.number)
+
+            with self._stage(STAGE_PARSE, timings):
+                commits = self._parse(result)
+
+            with self._stage(STAGE_COMMITS, timings):
+                vcs._link_parents(commits, vcs._parent_commits(commits))
+
+            with self._stage(STAGE_FILE_TREE, timings):
+                file_tree = vcs.file_tree(branch=branch_name)
+        except (SCMError, ProcessExecutionError, OSError) as exc:
+            logger.error(f"Sync of {job.repo_dir} ({job.branch}) failed: {exc}")
+            error = exc
+        finally:
+            vcs.close()
+
+        timings["total"] = time.perf_counter() - started
+        logger.debug(f"Synced {job.repo_dir} ({job.branch}): {timings}")
+        return SyncResult(
+            job=job,
+            commits=commits,
+            file_tree=file_tree,
+            timings=timings,
+            error=error,
+        )
+
+    def _parse(self, result: str) -> CommitIndex:
+        if len(result) < self.parse_pool_threshold:
+            return parse_commits_from_text(result, limits=self.limits)
+        future = self.parse_pool.submit(
+            parse_commits_from_text, result, limits=self.limits
+        )
+        return future.result()
+
+    @property
+    def parse_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self._parse_pool is None:
+                self._parse_pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.stage_limits[STAGE_PARSE]
+                )
+        return self._parse_pool
+
+
+class _Stage(object):
+    """Hold a stage slot and add the time spent inside to ``timings``.
+
+    Time spent waiting for the slot is not counted.
+    """
+
+    def __init__(
+        self, stage: str, semaphore: threading.Semaphore, timings: t.Dict[str, float]
+    ):
+        self.stage = stage
+        self.semaphore = semaphore
+        self.timings = timings
+        self._started = 0.0
+
+    def __enter__(self) -> "_Stage":
+        self.semaphore.acquire()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = time.perf_counter() - self._started
+        self.semaphore.release()
+        self.timings[self.stage] = self.timings.get(self.stage, 0.0) + elapsed
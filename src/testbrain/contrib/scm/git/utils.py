@@ -1,4 +1,5 @@
 import binascii
+import logging
 import os
 import pathlib
 import re
@@ -8,12 +9,21 @@ import typing_extensions as te
 
 from .patterns import (
     RE_COMMIT_DIFF,
-    RE_COMMIT_LIST,
+    RE_DIFF_A_PATH,
+    RE_DIFF_B_PATH,
+    RE_DIFF_DELETED_FILE_MODE,
+    RE_DIFF_HEADER_PATHS,
+    RE_DIFF_INDEX,
+    RE_DIFF_NEW_FILE_MODE,
+    RE_NUMSTAT_RENAME,
     RE_OCTAL_BYTE,
+    RE_SHA_LINE,
     RE_SUBMODULE_FILES_PATTERN,
     RE_SUBMODULE_HEADER,
 )
 
+logger = logging.getLogger(__name__)
+
 try:
     Literal = t.Literal
 except AttributeError:
@@ -64,76 +74,235 @@ class HshTD(TypedDict):
     files: t.Dict[str, FilesTD]
 
 
+class PatchLimits(t.NamedTuple):
+    """Size policy of captured patches, sizes are UTF-8 bytes.
+
+    A file patch above ``max_file_size``, or one that would take the
+    patches of its commit above ``max_commit_size``, is replaced with
+    ``PATCH_OMITTED_MARKER``; so are binary patches with ``skip_binary``.
+    """
+
+    max_file_size: t.Optional[int] = None
+    max_commit_size: t.Optional[int] = None
+    skip_binary: bool = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(
+            self.max_file_size is not None
+            or self.max_commit_size is not None
+            or self.skip_binary
+        )
+
+
+PATCH_OMITTED_MARKER = "<patch omitted: {reason}, {size} bytes>"
+
+
+class PatchBudget(object):
+    """Apply :class:`PatchLimits` to the file patches of one commit."""
+
+    __slots__ = ("limits", "used")
+
+    def __init__(self, limits: PatchLimits):
+        self.limits = limits
+        self.used = 0
+
+    def take(self, diff: "Diff") -> t.Optional[str]:
+        """Patch text of ``diff``, or a marker when it does not fit.
+
+        Oversized patches are measured in place and never decoded.
+        """
+        limits = self.limits
+        if limits.skip_binary and diff.is_binary():
+            return PATCH_OMITTED_MARKER.format(reason="binary", size=diff.patch_size())
+        if limits.max_file_size is None and limits.max_commit_size is None:
+            return diff.diff
+
+        size = diff.patch_size()
+        if limits.max_file_size is not None and size > limits.max_file_size:
+            return PATCH_OMITTED_MARKER.format(reason="file limit", size=size)
+        if (
+            limits.max_commit_size is not None
+            and self.used + size > limits.max_commit_size
+        ):
+            return PATCH_OMITTED_MARKER.format(reason="commit limit", size=size)
+        self.used += size
+        return diff.diff
+
+
+class CommitIndex(t.List[t.Dict]):
+    """List of commit dicts that can also be looked up by SHA in O(1).
+
+    Keeps insertion order and every list behaviour, so it can be returned
+    wherever a list of commits is expected. ``index[sha]``, ``index.get(sha)``
+    and ``sha in index`` use a SHA map; the first commit wins on duplicates.
+    """
+
+    _by_sha: t.Optional[t.Dict[str, t.Dict]] = None
+
+    @property
+    def by_sha(self) -> t.Dict[str, t.Dict]:
+        if self._by_sha is None:
+            by_sha: t.Dict[str, t.Dict] = {}
+            for commit in self:
+                by_sha.setdefault(commit["sha"], commit)
+            self._by_sha = by_sha
+        return self._by_sha
+
+    def get(self, sha: str, default: t.Optional[t.Dict] = None) -> t.Optional[t.Dict]:
+        return self.by_sha.get(sha, default)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.by_sha[key]
+        return super().__getitem__(key)
+
+    def __contains__(self, item) -> bool:
+        if isinstance(item, str):
+            return item in self.by_sha
+        return super().__contains__(item)
+
+    def append(self, commit: t.Dict) -> None:
+        super().append(commit)
+        if self._by_sha is not None:
+            self._by_sha.setdefault(commit["sha"], commit)
+
+    def extend(self, commits: t.Iterable[t.Dict]) -> None:
+        for commit in commits:
+            self.append(commit)
+
+    def __iadd__(self, commits: t.Iterable[t.Dict]) -> "CommitIndex":
+        self.extend(commits)
+        return self
+
+    def _reset(self) -> None:
+        self._by_sha = None
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self._reset()
+
+    def __delitem__(self, key) -> None:
+        super().__delitem__(key)
+        self._reset()
+
+    def insert(self, index: t.SupportsIndex, commit: t.Dict) -> None:
+        super().insert(index, commit)
+        self._reset()
+
+    def pop(self, index: t.SupportsIndex = -1) -> t.Dict:
+        commit = super().pop(index)
+        self._reset()
+        return commit
+
+    def remove(self, commit: t.Dict) -> None:
+        super().remove(commit)
+        self._reset()
+
+    def clear(self) -> None:
+        super().clear()
+        self._reset()
+
+
 def find_commit_by_sha(commit_list: t.List[t.Dict], sha: str):
+    if isinstance(commit_list, CommitIndex):
+        return commit_list.get(sha)
     for commit in commit_list:
         if commit["sha"] == sha:
             return commit
     return None
 
 
-def parse_stats_from_text(text: str) -> HshTD:
-    hsh: HshTD = HshTD(
-        {
-            "total": {
-                "additions": 0,
-                "insertions": 0,
-                "deletions": 0,
-                "changes": 0,
-                "lines": 0,
-                "files": 0,
-                "total": 0,
-            },
-            "files": {},
-        }
+def make_parent_commit(commit: t.Dict) -> t.Dict:
+    """Return the header-only copy of a commit used for ``parents`` entries."""
+    return dict(
+        sha=commit["sha"],
+        tree=commit["tree"],
+        date=commit["date"],
+        author=commit["author"].copy(),
+        committer=commit["committer"].copy(),
+        message=commit["message"],
+        parents=[dict(sha=parent["sha"]) for parent in commit["parents"]],
+        files=[],
     )
 
-    for line in text.splitlines():
-        (raw_insertions, raw_deletions, filename) = line.split("\t")
 
-        if "{" in filename:
+def parse_stats_from_text(text: str) -> HshTD:
+    """Per-file and total line counts of a ``git log --numstat`` block.
+
+    The block is split once into a flat list of fields (no list per line),
+    counts are converted in one pass per column and the totals are plain
+    ``sum`` reductions instead of seven counter updates per line.
+    """
+    text = text.rstrip("\n")
+    lines = text.count("\n") + 1 if text else 0
+    values = text.replace("\n", "\t").split("\t") if text else []
+    if len(values) != 3 * lines:
+        raise ValueError(f"Malformed numstat block: {text[:200]!r}")
+    insertions = [int(value) if value != "-" else 0 for value in values[0::3]]
+    deletions = [int(value) if value != "-" else 0 for value in values[1::3]]
+
+    files: t.Dict[str, FilesTD] = {}
+    for filename, file_insertions, file_deletions in zip(
+        values[2::3], insertions, deletions
+    ):
+        if "{" in filename or " => " in filename:
+            filename = expand_numstat_path(filename)
+        else:
+            filename = filename.strip()
+        files[filename] = make_file_stats(filename, file_insertions, file_deletions)
+
+    total_insertions = sum(insertions)
+    total_deletions = sum(deletions)
+    total_changes = total_insertions + total_deletions
+    total: TotalTD = {
+        "additions": total_insertions,
+        "insertions": total_insertions,
+        "deletions": total_deletions,
+        "changes": total_changes,
+        "lines": total_changes,
+        "files": lines,
+        "total": total_changes,
+    }
+    return HshTD(total=total, files=files)
+
+
+def expand_numstat_path(filename: str) -> str:
+    """Destination path of a numstat entry: ``a/{b => c}/d`` is ``a/c/d``."""
+    if "{" in filename:
+        match = RE_NUMSTAT_RENAME.match(filename)
+        if match is not None:
+            root_path, mid_path, end_path = match.groups()
+        else:
+            # "}" before "{" or unbalanced, cut as the first ones found
             root_path = filename[: filename.find("{")]
-            mid_path = (
-                filename[filename.find("{") + 1 : filename.find("}")]
-                .split("=>")[-1]
-                .strip()
-            )
+            mid_path = filename[filename.find("{") + 1 : filename.find("}")]
             end_path = filename[filename.find("}") + 1 :]
-            filename = root_path + mid_path + end_path
-            filename = filename.replace("//", "/")
-
-        if " => " in filename:
-            filename = filename.split(" => ")[1]
-
-        insertions = raw_insertions != "-" and int(raw_insertions) or 0
-        deletions = raw_deletions != "-" and int(raw_deletions) or 0
-
-        hsh["total"]["additions"] += insertions
-        hsh["total"]["insertions"] += insertions
-        hsh["total"]["deletions"] += deletions
-        hsh["total"]["changes"] += insertions + deletions
-        hsh["total"]["lines"] += insertions + deletions
-        hsh["total"]["total"] += insertions + deletions
-        hsh["total"]["files"] += 1
-
-        filename = filename.strip()
-
-        file_obj: FilesTD = FilesTD(
-            {
-                "filename": filename,
-                "sha": "",
-                "additions": insertions,
-                "insertions": insertions,
-                "deletions": deletions,
-                "changes": insertions + deletions,
-                "lines": insertions + deletions,
-                "status": "unknown",
-                "previous_filename": "",
-                "patch": "",
-                "blame": "",
-            }
-        )
-        hsh["files"][filename] = file_obj
-    return HshTD(total=hsh["total"], files=hsh["files"])
+        mid_path = mid_path.split("=>")[-1].strip()
+        filename = (root_path + mid_path + end_path).replace("//", "/")
+
+    if " => " in filename:
+        filename = filename.split(" => ")[1]
+
+    return filename.strip()
+
+
+def make_file_stats(filename: str, insertions: int, deletions: int) -> FilesTD:
+    return FilesTD(
+        {
+            "filename": filename,
+            "sha": "",
+            "additions": insertions,
+            "insertions": insertions,
+            "deletions": deletions,
+            "changes": insertions + deletions,
+            "lines": insertions + deletions,
+            "status": "unknown",
+            "previous_filename": "",
+            "patch": "",
+            "blame": "",
+        }
+    )
 
 
 def parse_person_from_text(text: str) -> t.Dict:
@@ -149,23 +318,246 @@ def parse_parent_from_text(text: t.Union[str, t.List[str]]) -> t.List[t.Dict]:
     return [dict(sha=sha) for sha in text]
 
 
-def parse_commits_from_text(text: str) -> t.List[t.Dict]:
-    commits: t.List[t.Dict] = []
+COMMIT_HEADERS = (
+    ("COMMIT:", "sha"),
+    ("TREE:", "tree"),
+    ("DATE:", "date"),
+    ("AUTHOR:", "author"),
+    ("COMMITTER:", "committer"),
+    ("MESSAGE:", "message"),
+    ("PARENTS:", "parents"),
+)
+
+SUBMODULE_HEADER_PREFIX = "Entering '"
+
+
+def is_numstat_line(line: str) -> bool:
+    insertions, sep, rest = line.partition("\t")
+    if not sep or not (insertions.isdigit() or insertions == "-"):
+        return False
+    deletions, sep, filename = rest.partition("\t")
+    return bool(sep) and (deletions.isdigit() or deletions == "-") and bool(filename)
+
 
-    text = re.sub(RE_SUBMODULE_HEADER, "", text)
+def split_commit_records(text: str) -> t.Iterator[str]:
+    """Cut ``git log`` output into per-commit texts at ``COMMIT:`` lines."""
+    if text.startswith("COMMIT:"):
+        start = 0
+    else:
+        start = text.find("\nCOMMIT:")
+        if start == -1:
+            return
+        start += 1
+    while True:
+        end = text.find("\nCOMMIT:", start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start : end + 1]
+        start = end + 1
+
+
+def parse_commit_record(record: str) -> t.Optional[t.Dict]:
+    """Split the text of one commit into its raw sections.
+
+    Linear state machine keyed on the ``COMMIT:``/``TREE:``/.../``PARENTS:``
+    markers emitted by :meth:`GitProcess.log`: header lines are read one by
+    one, then ``--raw`` and ``--numstat`` lines, and the first other
+    non-empty line starts the patch which runs to the end of the record.
+    Returns a dict with the same keys as the groups of ``RE_COMMIT_LIST``,
+    ready for :func:`parse_single_commit`, or None for a broken header.
+    """
+    commit_dict: t.Dict = {}
+    position = 0
+    size = len(record)
+
+    for prefix, key in COMMIT_HEADERS:
+        end = record.find("\n", position)
+        if end == -1:
+            end = size
+        line = record[position:end]
+        if not line.startswith(prefix):
+            return None
+        value = line[len(prefix) + 1 :]
+        if key == "parents":
+            value = value.strip() or None
+        commit_dict[key] = value
+        position = end + 1
+
+    raw: t.List[str] = []
+    numstats: t.List[str] = []
+    patch = None
+    while position < size:
+        end = record.find("\n", position)
+        if end == -1:
+            end = size
+        line = record[position:end]
+        if line.startswith(":"):
+            raw.append(line + "\n")
+        elif is_numstat_line(line):
+            numstats.append(line + "\n")
+        elif line.strip():
+            patch = record[position:]
+            break
+        position = end + 1
+
+    commit_dict["raw"] = "".join(raw) or None
+    commit_dict["numstats"] = "".join(numstats) or None
+    commit_dict["patch"] = patch
+    return commit_dict
+
+
+def parse_commits_from_text(
+    text: str, limits: t.Optional[PatchLimits] = None
+) -> CommitIndex:
+    return CommitIndex(parse_commits_from_text_iter(text, limits=limits))
+
+
+def parse_commits_from_text_iter(
+    text: str, limits: t.Optional[PatchLimits] = None
+) -> t.Iterator[t.Dict]:
+    if SUBMODULE_HEADER_PREFIX in text:
+        text = RE_SUBMODULE_HEADER.sub("", text)
+
+    for record in split_commit_records(text):
+        commit_dict = parse_commit_record(record)
+        if commit_dict is not None:
+            yield parse_single_commit(commit_dict, limits=limits)
+
+
+def iter_commit_records(lines: t.Iterable[bytes]) -> t.Iterator[str]:
+    """Group raw ``git log`` output lines into one decoded text per commit.
+
+    Only the lines of the commit being collected are kept in memory.
+    """
+    record: t.List[bytes] = []
+    for line in lines:
+        if line.startswith(b"COMMIT:"):
+            if record:
+                yield decode_record(b"".join(record))
+            record = [line]
+        elif record and not line.startswith(b"Entering '"):
+            record.append(line)
+    if record:
+        # Trailing whitespace of the output is dropped, as Process.execute does
+        yield decode_record(b"".join(record)).rstrip()
+
+
+def decode_record(data: bytes) -> str:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        logger.warning(
+            "Codec can't decode byte from output. Decode with ignoring char."
+        )
+        return data.decode("utf-8", errors="ignore")
 
-    for commit_match in RE_COMMIT_LIST.finditer(text):
-        commit: t.Dict = parse_single_commit(commit_match)
-        commits.append(commit)
+
+def parse_commits_from_lines(
+    lines: t.Iterable[bytes], limits: t.Optional[PatchLimits] = None
+) -> t.Iterator[t.Dict]:
+    for record in iter_commit_records(lines):
+        commit_dict = parse_commit_record(record)
+        if commit_dict is not None:
+            yield parse_single_commit(commit_dict, limits=limits)
+
+
+NUL_RECORD_MARKER = b"\x00\x00COMMIT\x00"
+NUL_HEADER_FIELDS = 11
+
+
+def decode_field(data: bytes) -> str:
+    return data.decode("utf-8", errors="ignore")
+
+
+def parse_commits_from_bytes(
+    data: bytes, limits: t.Optional[PatchLimits] = None
+) -> CommitIndex:
+    """Parse ``git log -z`` output of :meth:`GitProcess.log_z`.
+
+    Records start with ``NUL_RECORD_MARKER`` and every header field, raw
+    entry, numstat entry and path is NUL terminated, so the output is cut
+    with ``bytes.split`` only. Paths are taken verbatim, without the
+    quoting git applies to unusual names in the line based format.
+    """
+    commits = CommitIndex()
+    for record in data.split(NUL_RECORD_MARKER)[1:]:
+        commits.append(parse_commit_from_bytes(record, limits=limits))
     return commits
 
 
-def parse_commits_from_text_iter(text: str) -> t.Iterator[t.Dict]:
-    for commit_match in RE_COMMIT_LIST.finditer(text):
-        yield parse_single_commit(commit_match)
+def parse_commit_from_bytes(
+    record: bytes, limits: t.Optional[PatchLimits] = None
+) -> t.Dict:
+    fields = record.split(b"\x00", NUL_HEADER_FIELDS)
+    rest = fields.pop() if len(fields) > NUL_HEADER_FIELDS else b""
+    (
+        sha,
+        tree,
+        date,
+        author_name,
+        author_email,
+        author_date,
+        committer_name,
+        committer_email,
+        committer_date,
+        message,
+        parents,
+    ) = (decode_field(field) for field in fields)
 
+    commit = dict(
+        sha=sha,
+        tree=tree,
+        date=date,
+        author=dict(name=author_name, email=author_email, date=author_date),
+        committer=dict(name=committer_name, email=committer_email, date=committer_date),
+        message=message,
+        parents=parse_parent_from_text(parents or None),
+    )
+
+    files: t.Dict[str, FilesTD] = {}
+    diffs: DiffIndex = DiffIndex()
+    patch: t.Optional[bytes] = None
+
+    tokens = iter(rest.split(b"\x00"))
+    for token in tokens:
+        token = token.lstrip(b"\n")
+        if not token:
+            continue
+        if token.startswith(b":"):
+            meta = decode_field(token[1:])
+            paths = [decode_field(next(tokens))]
+            if meta.rsplit(" ", 1)[-1][:1] in ("R", "C"):
+                paths.append(decode_field(next(tokens)))
+            diffs.append(Diff._from_raw_entry(meta, paths))
+        elif token.startswith(b"diff --git"):
+            # Patch text is not NUL terminated, it runs to the end of record
+            patch = b"\x00".join([token, *tokens])
+            break
+        else:
+            raw_insertions, raw_deletions, path = token.split(b"\t", 2)
+            if not path:
+                # Copy or rename: source and destination follow
+                next(tokens)
+                path = next(tokens)
+            filename = decode_field(path)
+            insertions = int(raw_insertions) if raw_insertions != b"-" else 0
+            deletions = int(raw_deletions) if raw_deletions != b"-" else 0
+            files[filename] = make_file_stats(filename, insertions, deletions)
+
+    if patch is not None:
+        # Each file patch is decoded on its own, when it is read
+        patch_diffs = Diff.from_patch(patch.rstrip(b"\x00"))
+        diffs = patch_diffs or diffs
+
+    commit["files"] = merge_files_and_diffs(files=files, diffs=diffs, limits=limits)
+    return commit
 
-def parse_single_commit(commit_match: t.Union[t.Match[str], dict]) -> t.Dict:
+
+def parse_single_commit(
+    commit_match: t.Union[t.Match[str], dict],
+    limits: t.Optional[PatchLimits] = None,
+) -> t.Dict:
     if isinstance(commit_match, t.Match):
         commit_dict = commit_match.groupdict()
     else:
@@ -209,12 +601,42 @@ def parse_single_commit(commit_match: t.Union[t.Match[str], dict]) -> t.Dict:
 
     diffs = patch_diffs or raw_diffs
 
-    commit_files = merge_files_and_diffs(files=stats["files"], diffs=diffs)
+    commit_files = merge_files_and_diffs(
+        files=stats["files"], diffs=diffs, limits=limits
+    )
     commit["files"] = commit_files
 
     return commit
 
 
+def parse_patches_from_diff_tree(
+    text: str, shas: t.Iterable[str], limits: t.Optional[PatchLimits] = None
+) -> t.Dict[str, t.Dict[str, str]]:
+    """Split ``git diff-tree --stdin -p`` output into per-file patches.
+
+    Every commit section starts with a line holding only the commit SHA;
+    commits without changes (merges) print nothing. Returns
+    ``{commit sha: {filename: patch}}``, with ``limits`` applied per commit.
+    """
+    wanted = set(shas)
+    starts = [match for match in RE_SHA_LINE.finditer(text) if match[0] in wanted]
+    patches: t.Dict[str, t.Dict[str, str]] = {}
+    for position, match in enumerate(starts):
+        end = starts[position + 1].start() if position + 1 < len(starts) else None
+        diffs = Diff.from_patch(text[match.end() + 1 : end])
+        if limits is not None and limits.enabled:
+            budget = PatchBudget(limits)
+            patches[match[0]] = {
+                filename: budget.take(diff)
+                for filename, diff in diffs.as_dict().items()
+            }
+        else:
+            patches[match[0]] = {
+                filename: diff.diff for filename, diff in diffs.as_dict().items()
+            }
+    return patches
+
+
 def parse_files_foreach_submodules(text: str) -> t.List[str]:
     result = []
 
@@ -233,18 +655,25 @@ def parse_files_foreach_submodules(text: str) -> t.List[str]:
 
 
 def merge_files_and_diffs(
-    files: t.Dict[str, FilesTD], diffs: t.Optional["DiffIndex"] = None
+    files: t.Dict[str, FilesTD],
+    diffs: t.Optional["DiffIndex"] = None,
+    limits: t.Optional[PatchLimits] = None,
 ):
     diffs_dict = {}
     if diffs is not None:
         diffs_dict = diffs.as_dict()
 
+    budget = PatchBudget(limits) if limits is not None and limits.enabled else None
+
     commit_files: t.List[FilesTD] = []
 
     for filename, commit_file in files.items():
         file_diff: t.Optional[Diff] = diffs_dict.get(filename, None)
         if file_diff:
-            commit_file["patch"] = file_diff.diff
+            if budget is not None:
+                commit_file["patch"] = budget.take(file_diff)
+            else:
+                commit_file["patch"] = file_diff.diff
             if file_diff.b_blob:
                 commit_file["sha"] = file_diff.b_blob["sha"]
 
@@ -302,6 +731,128 @@ def decode_path(path: str, has_ab_prefix: bool = True) -> t.Optional[str]:
     return path
 
 
+PATCH_BUFFER = t.Union[str, bytes]
+
+# Optional lines after "diff --git", in the order RE_COMMIT_DIFF accepts them.
+# Its "old mode", "similarity index" and "copy" groups expect a literal
+# backslash before the digits and never match git output, so they are not
+# looked for: the lines stay in the patch text as before.
+PATCH_HEADER_LINES = (
+    ("new file mode ", RE_DIFF_NEW_FILE_MODE),
+    ("deleted file mode ", RE_DIFF_DELETED_FILE_MODE),
+    ("index ", RE_DIFF_INDEX),
+    ("--- ", RE_DIFF_A_PATH),
+    ("+++ ", RE_DIFF_B_PATH),
+)
+
+
+def scan_patch_headers(
+    data: PATCH_BUFFER,
+) -> t.Iterator[t.Tuple[int, int, t.Tuple[t.Optional[str], ...]]]:
+    """Find the ``diff --git`` header blocks of a patch.
+
+    The boundaries are located with ``str.find``/``bytes.find``, only the
+    header lines themselves are decoded and matched. Yields ``(start, end,
+    groups)`` per file, where ``groups`` are the captures of
+    ``RE_COMMIT_DIFF`` and ``data[end:next start]`` is the file patch.
+    """
+    if isinstance(data, str):
+        marker, newline = "diff --git ", "\n"
+    else:
+        marker, newline = b"diff --git ", b"\n"
+    boundary = newline + marker
+    size = len(data)
+
+    start = 0 if data.startswith(marker) else data.find(boundary)
+    while start != -1:
+        if data[start] == boundary[0]:
+            start += 1
+        line_end = data.find(newline, start)
+        if line_end == -1:
+            return
+        paths = RE_DIFF_HEADER_PATHS.fullmatch(
+            _decode_header_line(data[start + len(marker) : line_end])
+        )
+        if paths is None:
+            start = data.find(boundary, line_end)
+            continue
+
+        captures: t.List[t.Optional[str]] = []
+        position = line_end + 1
+        for prefix, pattern in PATCH_HEADER_LINES:
+            match = None
+            if position < size:
+                line_end = data.find(newline, position)
+                if line_end == -1:
+                    line_end = size
+                line = _decode_header_line(data[position:line_end])
+                if line.startswith(prefix):
+                    match = pattern.fullmatch(line)
+            if match is not None:
+                captures.extend(match.groups())
+                position = line_end + 1
+            else:
+                captures.extend([None] * pattern.groups)
+        position = min(position, size)
+
+        new_file_mode, deleted_file_mode, a_blob_id, b_blob_id, b_mode = captures[:5]
+        a_path, b_path = captures[5:]
+        yield start, position, (
+            paths[1],
+            paths[2],
+            None,
+            None,
+            None,
+            None,
+            new_file_mode,
+            deleted_file_mode,
+            None,
+            a_blob_id,
+            b_blob_id,
+            b_mode,
+            a_path,
+            b_path,
+        )
+        start = data.find(boundary, position - 1)
+
+
+def _decode_header_line(line: PATCH_BUFFER) -> str:
+    if isinstance(line, str):
+        return line
+    return line.decode("utf-8", errors="ignore")
+
+
+def decode_patch(buffer: t.Union[str, memoryview], start: int, end: int) -> str:
+    """Text of ``buffer[start:end]``, decoding only this slice of bytes."""
+    if isinstance(buffer, str):
+        return buffer[start:end]
+    view = buffer[start:end]
+    try:
+        return str(view, "utf-8")
+    except UnicodeDecodeError:
+        logger.warning(
+            "Codec can't decode byte from output. Decode with ignoring char."
+        )
+        return str(view, "utf-8", "ignore")
+
+
+UTF8_SIZE_CHUNK = 1024 * 1024
+BINARY_PROBE_SIZE = 4096
+
+
+def utf8_size(text: str, start: int = 0, end: t.Optional[int] = None) -> int:
+    """UTF-8 length of ``text[start:end]``, encoded a chunk at a time."""
+    end = len(text) if end is None else end
+    size = 0
+    for position in range(start, end, UTF8_SIZE_CHUNK):
+        chunk = text[position : min(position + UTF8_SIZE_CHUNK, end)]
+        if chunk.isascii():
+            size += len(chunk)
+        else:
+            size += len(chunk.encode("utf-8", errors="surrogatepass"))
+    return size
+
+
 def mode_str_to_int(mode_str: str) -> int:
     """
     :param mode_str: string like 755 or 644 or 100644
@@ -402,7 +953,8 @@ class Diff(object):
         "copied_file",
         "raw_rename_from",
         "raw_rename_to",
-        "diff",
+        "_diff",
+        "_diff_span",
         "change_type",
         "score",
     )
@@ -480,7 +1032,7 @@ class Diff(object):
         self.change_type = change_type
 
     def __eq__(self, other: object) -> bool:
-        for name in self.__slots__:
+        for name in self._compared_fields():
             if getattr(self, name) != getattr(other, name):
                 return False
         # END for each name
@@ -490,7 +1042,59 @@ class Diff(object):
         return not (self == other)
 
     def __hash__(self) -> int:
-        return hash(tuple(getattr(self, n) for n in self.__slots__))
+        return hash(tuple(getattr(self, n) for n in self._compared_fields()))
+
+    def _compared_fields(self) -> t.Iterator[str]:
+        # The patch is compared decoded, whatever buffer it still points to
+        for name in self.__slots__:
+            if name == "_diff":
+                yield "diff"
+            elif name != "_diff_span":
+                yield name
+
+    @property
+    def diff(self) -> t.Union[str, None]:
+        """Patch text of the file, decoded from the shared buffer on access."""
+        if self._diff_span is not None:
+            self._diff = decode_patch(*self._diff_span)
+            self._diff_span = None
+        return self._diff
+
+    @diff.setter
+    def diff(self, value: t.Union[str, None]) -> None:
+        self._diff = value
+        self._diff_span = None
+
+    def _set_diff_span(
+        self, buffer: t.Union[str, memoryview], start: int, end: t.Optional[int]
+    ) -> None:
+        self._diff = None
+        self._diff_span = (buffer, start, len(buffer) if end is None else end)
+
+    def patch_size(self) -> int:
+        """UTF-8 size of the patch in bytes, measured without decoding it."""
+        if self._diff_span is not None:
+            buffer, start, end = self._diff_span
+            if isinstance(buffer, str):
+                return utf8_size(buffer, start, end)
+            return end - start
+        return utf8_size(self._diff) if self._diff else 0
+
+    def is_binary(self) -> bool:
+        """True for ``Binary files ... differ`` and ``GIT binary patch`` diffs."""
+        if self._diff_span is not None:
+            buffer, start, end = self._diff_span
+            head = buffer[start : min(end, start + BINARY_PROBE_SIZE)]
+            if not isinstance(head, str):
+                head = str(head, "utf-8", "ignore")
+        else:
+            head = (self._diff or "")[:BINARY_PROBE_SIZE]
+        for line in head.splitlines():
+            if line.startswith("@@"):
+                return False
+            if line.startswith("Binary files ") or line == "GIT binary patch":
+                return True
+        return False
 
     def __str__(self) -> str:
         h: str = "%s"
@@ -586,15 +1190,21 @@ class Diff(object):
         return None
 
     @classmethod
-    def _index_from_patch_format(cls, text: str) -> DiffIndex:
+    def _index_from_patch_format(cls, text: PATCH_BUFFER) -> DiffIndex:
+        """Create a DiffIndex from a patch, given as text or as raw bytes.
+
+        File patches are not copied out of ``text``: every Diff keeps an
+        offset pair into the shared buffer and slices (and for bytes,
+        decodes) its part on the first access to ``diff``.
+        """
         index: "DiffIndex" = DiffIndex()
-        previous_header: t.Union[t.Match[str], None] = None
-        header: t.Union[t.Match[str], None] = None
+        buffer = text if isinstance(text, str) else memoryview(text)
+        previous_end: t.Optional[int] = None
         # a_path: str
         # b_path: str
         # a_mode: str
         # b_mode: str
-        for _header in cls.re_header.finditer(text):
+        for header_start, header_end, groups in scan_patch_headers(text):
             (
                 a_path_fallback,
                 b_path_fallback,
@@ -610,7 +1220,7 @@ class Diff(object):
                 b_mode,
                 a_path,
                 b_path,
-            ) = _header.groups()
+            ) = groups
 
             new_file, deleted_file, copied_file = (
                 bool(new_file_mode),
@@ -621,11 +1231,10 @@ class Diff(object):
             a_path = cls._pick_best_path(a_path, rename_from, a_path_fallback)
             b_path = cls._pick_best_path(b_path, rename_to, b_path_fallback)
 
-            # Our only means to find the actual text is to see
-            # what has not been matched by our regex,
-            # and then retroactively assign it to our index
-            if previous_header is not None:
-                index[-1].diff = text[previous_header.end() : _header.start()]
+            # The patch of a file runs from the end of its header block
+            # to the start of the next one
+            if previous_end is not None:
+                index[-1]._set_diff_span(buffer, previous_end, header_start)
             # end assign actual diff
 
             a_mode = (
@@ -654,11 +1263,10 @@ class Diff(object):
                 )
             )
 
-            previous_header = _header
-            header = _header
+            previous_end = header_end
         # end for each header we parse
-        if index and header:
-            index[-1].diff = text[header.end() :]
+        if index and previous_end is not None:
+            index[-1]._set_diff_span(buffer, previous_end, None)
         # end assign last diff
 
         return index
@@ -687,71 +1295,76 @@ class Diff(object):
             meta, _, _ = info.partition("\x00")
 
             path = path.rstrip("\x00")
-            a_blob_id: t.Optional[str]
-            b_blob_id: t.Optional[str]
-            old_mode, new_mode, a_blob_id, b_blob_id, _change_type = meta.split(None, 4)
-            # Change type can be R100
-            # R: status letter
-            # 100: score (in case of copy and rename)
-            # assert is_change_type(_change_type[0]),
-            # f"Unexpected value for change_type received: {_change_type[0]}"
-            change_type: LIT_CHANGE_TYPE = t.cast(LIT_CHANGE_TYPE, _change_type[0])
-            score_str = "".join(_change_type[1:])
-            score = int(score_str) if score_str.isdigit() else None
             path = path.strip()
-            a_path = path
-            b_path = path
-            deleted_file = False
-            new_file = False
-            copied_file = False
-            rename_from = None
-            rename_to = None
-
-            # NOTE: We cannot conclude from the existence of a blob to change type
-            # as diffs with the working do not have blobs yet
-            if change_type == "D":
-                b_blob_id = None  # Optional[str]
-                deleted_file = True
-            elif change_type == "A":
-                a_blob_id = None
-                new_file = True
-            elif change_type == "C":
-                copied_file = True
-                a_path_str, b_path_str = path.split("\t", 1)
-                a_path = a_path_str
-                b_path = b_path_str
-            elif change_type == "R":
-                a_path_str, b_path_str = path.split("\t", 1)
-                a_path = a_path_str
-                b_path = b_path_str
-                rename_from, rename_to = a_path, b_path
-            elif change_type == "T":
-                # Nothing to do
-                pass
-            # END add/remove handling
-
-            diff = Diff(
-                a_path,
-                b_path,
-                a_blob_id,
-                b_blob_id,
-                old_mode,
-                new_mode,
-                new_file,
-                deleted_file,
-                copied_file,
-                rename_from,
-                rename_to,
-                "",
-                change_type,
-                score,
-            )
-            index.append(diff)
+            index.append(cls._from_raw_entry(meta, path.split("\t", 1)))
 
         return index
 
     @classmethod
-    def from_patch(cls, text: str) -> DiffIndex:
+    def _from_raw_entry(cls, meta: str, paths: t.List[str]) -> "Diff":
+        """Build a Diff from one raw entry.
+
+        :param meta: ``old_mode new_mode a_blob b_blob status`` part of the entry
+        :param paths: the path, or source and destination paths of a copy or
+            rename
+        """
+        a_blob_id: t.Optional[str]
+        b_blob_id: t.Optional[str]
+        old_mode, new_mode, a_blob_id, b_blob_id, _change_type = meta.split(None, 4)
+        # Change type can be R100
+        # R: status letter
+        # 100: score (in case of copy and rename)
+        # assert is_change_type(_change_type[0]),
+        # f"Unexpected value for change_type received: {_change_type[0]}"
+        change_type: LIT_CHANGE_TYPE = t.cast(LIT_CHANGE_TYPE, _change_type[0])
+        score_str = "".join(_change_type[1:])
+        score = int(score_str) if score_str.isdigit() else None
+        a_path = paths[0]
+        b_path = paths[0]
+        deleted_file = False
+        new_file = False
+        copied_file = False
+        rename_from = None
+        rename_to = None
+
+        # NOTE: We cannot conclude from the existence of a blob to change type
+        # as diffs with the working do not have blobs yet
+        if change_type == "D":
+            b_blob_id = None  # Optional[str]
+            deleted_file = True
+        elif change_type == "A":
+            a_blob_id = None
+            new_file = True
+        elif change_type == "C":
+            copied_file = True
+            a_path, b_path = paths
+        elif change_type == "R":
+            a_path, b_path = paths
+            rename_from, rename_to = a_path, b_path
+        elif change_type == "T":
+            # Nothing to do
+            pass
+        # END add/remove handling
+
+        return Diff(
+            a_path,
+            b_path,
+            a_blob_id,
+            b_blob_id,
+            old_mode,
+            new_mode,
+            new_file,
+            deleted_file,
+            copied_file,
+            rename_from,
+            rename_to,
+            "",
+            change_type,
+            score,
+        )
+
+    @classmethod
+    def from_patch(cls, text: PATCH_BUFFER) -> DiffIndex:
         return cls._index_from_patch_format(text)
 
     @classmethod
@@ -1,4 +1,4 @@
 from .exceptions import ProcessExecutionError
-from .process import Process
+from .process import AsyncProcess, Process
 
-__all__ = ["Process", "ProcessExecutionError"]
+__all__ = ["AsyncProcess", "Process", "ProcessExecutionError"]
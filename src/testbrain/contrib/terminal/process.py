@@ -1,8 +1,10 @@
 import abc
+import asyncio
 import logging
 import os
 import pathlib
 import subprocess
+import threading
 import typing as t
 
 from testbrain.contrib.terminal.exceptions import ProcessExecutionError
@@ -27,7 +29,11 @@ class Process(abc.ABC):
     def work_dir(self) -> pathlib.Path:
         return self._work_dir
 
-    def execute(self, command: t.Union[str, t.List[str]]) -> str:
+    def execute(
+        self,
+        command: t.Union[str, t.List[str]],
+        input: t.Optional[bytes] = None,
+    ) -> str:
         ret_value = ""
 
         if isinstance(command, list):
@@ -39,6 +45,7 @@ class Process(abc.ABC):
             logger.debug(f"Exec process {command}")
             proc_output = subprocess.run(
                 command,
+                input=input,
                 text=False,
                 check=True,
                 capture_output=True,
@@ -93,3 +100,210 @@ class Process(abc.ABC):
             if proc_output:
                 ret_value = proc_output.stdout.decode("utf-8", errors="ignore")
         return ret_value.strip()
+
+    def stream(self, command: t.Union[str, t.List[str]]) -> t.Iterator[bytes]:
+        """Run ``command`` and yield its stdout line by line as it arrives.
+
+        The output is never accumulated, so memory usage does not depend on
+        how much the command prints. Closing the iterator early kills the
+        process.
+        """
+        if isinstance(command, list):
+            command = " ".join(command)
+
+        logger.debug(f"Stream process {command}")
+        try:
+            proc = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                shell=True,
+                cwd=self.work_dir,
+                env=self.env,
+            )
+        except (FileNotFoundError, NotADirectoryError, PermissionError) as exc:
+            err_msg = f"Failed to run {command}: {exc}"
+            logger.critical(f"Process execution failed: {err_msg}")
+            raise ProcessExecutionError(
+                returncode=127, cmd=command, stderr=err_msg
+            ) from exc
+
+        # stderr is drained in background so a chatty process cannot block
+        # on a full pipe while we are still reading stdout
+        stderr_chunks: t.List[bytes] = []
+        stderr_reader = threading.Thread(
+            target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True
+        )
+        stderr_reader.start()
+
+        try:
+            for line in proc.stdout:
+                yield line
+            proc.stdout.close()
+            returncode = proc.wait()
+        finally:
+            if proc.poll() is None:
+                logger.debug(f"Stream of {command} closed early, kill process")
+                proc.stdout.close()
+                proc.kill()
+                proc.wait()
+
+        stderr_reader.join()
+
+        if returncode != 0:
+            err_output = b"".join(stderr_chunks)
+            logger.debug(
+                f"Failed to run {command}: "
+                f"return code {returncode}, error: {err_output}"
+            )
+            raise ProcessExecutionError(
+                returncode=returncode, cmd=command, stderr=err_output
+            )
+
+
+class AsyncProcess(abc.ABC):
+    """Asyncio counterpart of :class:`Process`.
+
+    List commands are started with ``asyncio.create_subprocess_exec``, so
+    every argument reaches the program as is; string commands go through
+    the shell. Many processes can run concurrently from one event loop.
+    """
+
+    _work_dir: pathlib.Path
+
+    # Bytes requested from a pipe per read
+    chunk_size: int = 64 * 1024
+
+    def __init__(self, work_dir: t.Optional[pathlib.Path] = None):
+        if work_dir is None:
+            work_dir = pathlib.Path(".").resolve()
+
+        self._work_dir = work_dir
+        logger.debug(f"Set up execution working dir: {self._work_dir}")
+
+        logger.debug("Set up environment: inherited from OS")
+        self.env = os.environ
+
+    @property
+    def work_dir(self) -> pathlib.Path:
+        return self._work_dir
+
+    async def _spawn(
+        self, command: t.Union[str, t.List[str]], stdin: t.Optional[int] = None
+    ) -> "asyncio.subprocess.Process":
+        try:
+            if isinstance(command, list):
+                return await asyncio.create_subprocess_exec(
+                    *command,
+                    stdin=stdin,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=self.work_dir,
+                    env=self.env,
+                )
+            return await asyncio.create_subprocess_shell(
+                command,
+                stdin=stdin,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=self.work_dir,
+                env=self.env,
+            )
+        except (FileNotFoundError, NotADirectoryError, PermissionError) as exc:
+            err_msg = f"Failed to run {command}: {exc}"
+            logger.critical(f"Process execution failed: {err_msg}")
+            raise ProcessExecutionError(
+                returncode=127, cmd=command, stderr=err_msg
+            ) from exc
+
+    async def execute(
+        self,
+        command: t.Union[str, t.List[str]],
+        input: t.Optional[bytes] = None,
+    ) -> str:
+        logger.debug(f"Exec process {command}")
+        proc = await self._spawn(
+            command, stdin=asyncio.subprocess.PIPE if input is not None else None
+        )
+        try:
+            stdout, stderr = await proc.communicate(input=input)
+        except asyncio.CancelledError:
+            logger.debug(f"Exec of {command} cancelled, kill process")
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            raise
+
+        logger.debug(f"Exec output: {stdout}")
+        if proc.returncode != 0:
+            err_msg = (
+                f"Failed to run {command}: "
+                f"return code {proc.returncode}, "
+                f"output: {stdout}, error: {stderr}"
+            )
+            logger.debug(err_msg)
+            raise ProcessExecutionError(
+                returncode=proc.returncode,
+                cmd=command,
+                output=stdout,
+                stderr=stderr,
+            )
+
+        try:
+            ret_value = stdout.decode("utf-8")
+        except UnicodeDecodeError as exc:
+            logger.debug(f"Failed to run {command}: {exc}")
+            err_msg = "Codec can't decode byte from output. Decode with ignoring char."
+            logger.warning(err_msg)
+            ret_value = stdout.decode("utf-8", errors="ignore")
+        return ret_value.strip()
+
+    async def stream(
+        self, command: t.Union[str, t.List[str]]
+    ) -> t.AsyncIterator[bytes]:
+        """Run ``command`` and yield its stdout line by line as it arrives.
+
+        Lines of any length are supported, the output is read in chunks of
+        :attr:`chunk_size` bytes. Closing the iterator early, or cancelling
+        the task consuming it, kills the process.
+        """
+        logger.debug(f"Stream process {command}")
+        proc = await self._spawn(command)
+
+        # stderr is drained concurrently so a chatty process cannot block
+        # on a full pipe while we are still reading stdout
+        stderr_reader = asyncio.ensure_future(proc.stderr.read())
+
+        try:
+            buffer = bytearray()
+            while True:
+                chunk = await proc.stdout.read(self.chunk_size)
+                if not chunk:
+                    break
+                buffer += chunk
+                end = buffer.rfind(b"\n") + 1
+                if not end:
+                    continue
+                lines = bytes(buffer[:end]).split(b"\n")
+                del buffer[:end]
+                for line in lines[:-1]:
+                    yield line + b"\n"
+            if buffer:
+                yield bytes(buffer)
+            returncode = await proc.wait()
+        finally:
+            if proc.returncode is None:
+                logger.debug(f"Stream of {command} closed early, kill process")
+                stderr_reader.cancel()
+                proc.kill()
+                await proc.wait()
+
+        err_output = await stderr_reader
+        if returncode != 0:
+            logger.debug(
+                f"Failed to run {command}: "
+                f"return code {returncode}, error: {err_output}"
+            )
+            raise ProcessExecutionError(
+                returncode=returncode, cmd=command, stderr=err_output
+            )
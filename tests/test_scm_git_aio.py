@@ -0,0 +1,88 @@
+import asyncio
+import shutil
+import subprocess
+
+import pytest
+
+from testbrain.contrib.scm.exceptions import BranchNotFound, ProcessError
+from testbrain.contrib.scm.git.aio import AsyncGitProcess, AsyncGitVCS
+from testbrain.contrib.scm.git.process import PRETTY_FORMAT
+
+
+def test_async_git_process_log_command():
+    process = AsyncGitProcess()
+    command = process._log_command(rev="main", number=5, patch=False)
+    assert command == [
+        "git",
+        "-c",
+        "diff.renames=0",
+        "-c",
+        "diff.renameLimit=999999",
+        "log",
+        "-n",
+        "5",
+        "--abbrev=40",
+        "--full-diff",
+        "--full-index",
+        "--reverse",
+        "--raw",
+        "--numstat",
+        f"--pretty=format:{PRETTY_FORMAT}",
+        "main",
+    ]
+
+
+def test_async_git_process_rev_parse_error(fp):
+    fp.register(
+        ["git", "rev-parse", "missing"],
+        stderr="fatal: ambiguous argument 'missing'",
+        returncode=128,
+    )
+    process = AsyncGitProcess()
+    with pytest.raises(ProcessError, match="Failed rev-parse"):
+        asyncio.run(process.rev_parse("missing"))
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_async_git_vcs(fp, tmp_path):
+    fp.allow_unregistered(True)
+    fp.pass_command([fp.any()])
+
+    def git(*args):
+        return subprocess.run(
+            ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com"]
+            + list(args),
+            cwd=tmp_path,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+
+    git("init", "-q", "-b", "main")
+    for number in range(3):
+        (tmp_path / f"file{number}.txt").write_text(f"{number}\n")
+        git("add", ".")
+        git("commit", "-q", "-m", f"Commit {number}")
+    shas = git("rev-list", "--reverse", "HEAD").split()
+
+    async def run():
+        vcs = AsyncGitVCS(tmp_path)
+        return await asyncio.gather(
+            vcs.get_branch("main"),
+            vcs.commits(number=2),
+            vcs.file_tree("main"),
+            vcs.get_current_branch(),
+        )
+
+    branch, commits, file_tree, current = asyncio.run(run())
+    assert branch == ("main", shas[-1], False)
+    assert [commit["sha"] for commit in commits] == shas[1:]
+    # Parents outside the window are still resolved
+    assert commits[0]["parents"][0]["sha"] == shas[0]
+    assert commits[0]["parents"][0]["message"] == "Commit 0"
+    assert commits[1]["files"][0]["filename"] == "file2.txt"
+    assert file_tree == ["file0.txt", "file1.txt", "file2.txt"]
+    assert current == "main"
+
+    with pytest.raises(BranchNotFound):
+        asyncio.run(AsyncGitVCS(tmp_path).get_branch("missing"))
@@ -0,0 +1,81 @@
+from testbrain.contrib.scm.git.cache import CommitCache, SyncState, cache_variant
+from testbrain.contrib.scm.git.utils import PatchLimits
+
+
+def make_commit(sha: str, message: str = "commit") -> dict:
+    return {
+        "sha": sha,
+        "tree": "4a8ad1bd1ef4c4bd06b4c1a0b3d3b0a8d1f34e36",
+        "message": message,
+        "parents": [],
+        "files": [],
+    }
+
+
+def test_cache_variant():
+    assert cache_variant() == "nrp"
+    assert cache_variant(numstat=True, raw=False, patch=False) == "n--"
+    limits = PatchLimits(max_file_size=1024, skip_binary=True)
+    assert cache_variant(limits=limits) == "nrp:1024:None:1"
+    assert cache_variant(patch=False, limits=limits) == "nr-"
+    assert cache_variant(limits=PatchLimits()) == "nrp"
+
+
+def test_commit_cache(tmp_path):
+    cache = CommitCache.for_git_dir(tmp_path)
+    cache.put_many([make_commit("a" * 40), make_commit("b" * 40)], "nrp")
+
+    assert cache.path == tmp_path / "testbrain" / "commits.sqlite"
+    assert cache.get_many(["a" * 40, "c" * 40], "nrp") == {
+        "a" * 40: make_commit("a" * 40)
+    }
+    # Commits parsed with other diff options are stored separately
+    assert cache.get_many(["a" * 40], "n--") == {}
+    cache.close()
+
+    reopened = CommitCache.for_git_dir(tmp_path)
+    assert list(reopened.get_many(["b" * 40], "nrp")) == ["b" * 40]
+    reopened.clear()
+    assert reopened.size() == 0
+    reopened.close()
+
+
+def test_commit_cache_eviction(tmp_path):
+    cache = CommitCache(tmp_path / "commits.sqlite")
+    cache.put_many([make_commit("a" * 40, message="a" * 1000)], "nrp")
+
+    cache.max_size = cache.size() * 5 // 2
+    cache.put_many([make_commit("b" * 40, message="b" * 1000)], "nrp")
+    cache.get_many(["a" * 40], "nrp")
+    cache.put_many([make_commit("c" * 40, message="c" * 1000)], "nrp")
+
+    # The least recently used entry is dropped first
+    assert set(cache.get_many(["a" * 40, "b" * 40, "c" * 40], "nrp")) == {
+        "a" * 40,
+        "c" * 40,
+    }
+    assert cache.size() <= cache.max_size
+    cache.close()
+
+
+def test_commit_cache_broken_file(tmp_path):
+    path = tmp_path / "commits.sqlite"
+    path.write_bytes(b"not a database")
+    cache = CommitCache(path)
+
+    assert cache.get_many(["a" * 40], "nrp") == {}
+    cache.put_many([make_commit("a" * 40)], "nrp")
+
+
+def test_sync_state(tmp_path):
+    state = SyncState.for_git_dir(tmp_path)
+    assert state.get("main") is None
+
+    state.set("main", "a" * 40)
+    state.set("dev", "b" * 40)
+    state.set("main", "c" * 40)
+
+    reopened = SyncState.for_git_dir(tmp_path)
+    assert reopened.path == tmp_path / "testbrain" / "sync.json"
+    assert reopened.get("main") == "c" * 40
+    assert reopened.get("dev") == "b" * 40
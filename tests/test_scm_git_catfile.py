@@ -0,0 +1,101 @@
+import shutil
+import subprocess
+
+import pytest
+
+from testbrain.contrib.scm.git.catfile import (
+    GitCatFile,
+    parse_commit_object,
+    parse_tree_object,
+)
+
+FAKE_COMMIT_OBJECT = (
+    b"tree a2bd09a6cc8a36da7fd43a3b8445967584873e5e\n"
+    b"parent 27d9aaff69ac8db9d19918c4d5efb6b3ed2c3210\n"
+    b"parent 0cd26c4deaebd98ff26b8cf20bda15553ef5bdcd\n"
+    b"author Artem Demidenko <ar.demidenko@gmail.com> 1695993225 +0300\n"
+    b"committer Artem Demidenko <ar.demidenko@gmail.com> 1695993225 -0930\n"
+    b"gpgsig -----BEGIN PGP SIGNATURE-----\n"
+    b" \n"
+    b" iQEzBAABCAAdFiEE\n"
+    b" -----END PGP SIGNATURE-----\n"
+    b"\n"
+    b"Merge branch 'dev'\n"
+    b"into main\n"
+    b"\n"
+    b"Body of the message\n"
+)
+
+
+def test_parse_commit_object():
+    commit = parse_commit_object(
+        "5355a13f5ba44d23de9a3090ad976d63d1a60e3e", FAKE_COMMIT_OBJECT
+    )
+    assert commit == {
+        "sha": "5355a13f5ba44d23de9a3090ad976d63d1a60e3e",
+        "tree": "a2bd09a6cc8a36da7fd43a3b8445967584873e5e",
+        "date": "2023-09-29T16:13:45+03:00",
+        "author": {
+            "name": "Artem Demidenko",
+            "email": "ar.demidenko@gmail.com",
+            "date": "2023-09-29T16:13:45+03:00",
+        },
+        "committer": {
+            "name": "Artem Demidenko",
+            "email": "ar.demidenko@gmail.com",
+            "date": "2023-09-29T03:43:45-09:30",
+        },
+        "message": "Merge branch 'dev' into main",
+        "parents": [
+            {"sha": "27d9aaff69ac8db9d19918c4d5efb6b3ed2c3210"},
+            {"sha": "0cd26c4deaebd98ff26b8cf20bda15553ef5bdcd"},
+        ],
+        "files": [],
+    }
+
+
+def test_parse_tree_object():
+    data = (
+        b"100644 README.md\x00"
+        + bytes.fromhex("11" * 20)
+        + b"40000 src\x00"
+        + bytes.fromhex("22" * 20)
+    )
+    entries = parse_tree_object(data)
+    assert [(entry.mode, entry.name, entry.sha) for entry in entries] == [
+        ("100644", "README.md", "11" * 20),
+        ("40000", "src", "22" * 20),
+    ]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_git_cat_file(fp, tmp_path):
+    fp.allow_unregistered(True)
+    fp.pass_command([fp.any()])
+
+    def git(*args):
+        return subprocess.run(
+            ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com"]
+            + list(args),
+            cwd=tmp_path,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+
+    git("init", "-q")
+    (tmp_path / "file.txt").write_text("content\n")
+    git("add", "file.txt")
+    git("commit", "-q", "-m", "Initial commit")
+    sha = git("rev-parse", "HEAD")
+
+    with GitCatFile(tmp_path) as cat_file:
+        commit = cat_file.commit(sha)
+        assert commit["sha"] == sha
+        assert commit["message"] == "Initial commit"
+        assert commit["date"] == git("log", "-1", "--pretty=%aI")
+        assert [entry.name for entry in cat_file.tree_entries(sha)] == ["file.txt"]
+        assert cat_file.blob_size(sha, "file.txt") == 8
+        assert cat_file.info("0" * 40) is None
+        # The same process answers every lookup
+        assert cat_file.commit("HEAD")["sha"] == sha
@@ -0,0 +1,113 @@
+import shutil
+import subprocess
+
+import pytest
+
+from testbrain.contrib.scm.git.odb import (
+    ObjectStore,
+    ObjectStoreError,
+    apply_delta,
+    find_git_dir,
+    quote_path,
+)
+from testbrain.contrib.scm.git.process import GitVCS
+
+
+def test_quote_path():
+    assert quote_path(b"src/main.py") == "src/main.py"
+    assert quote_path(b"with space.txt") == "with space.txt"
+    assert quote_path(b'quo"te') == '"quo\\"te"'
+    assert quote_path(b"back\\slash") == '"back\\\\slash"'
+    assert quote_path(b"tab\there") == '"tab\\there"'
+    assert quote_path("ü.txt".encode("utf-8")) == '"\\303\\274.txt"'
+    assert quote_path("ü.txt".encode("utf-8"), quote_non_ascii=False) == "ü.txt"
+
+
+def test_apply_delta():
+    base = b"Hello, world!\n"
+    delta = (
+        bytes([len(base), 19])
+        # Copy 7 bytes from offset 0
+        + bytes([0x80 | 0x10, 7])
+        + bytes([5])
+        + b"delta"
+        # Copy 7 bytes from offset 7
+        + bytes([0x80 | 0x01 | 0x10, 7, 7])
+    )
+    assert apply_delta(base, delta) == b"Hello, deltaworld!\n"
+
+    with pytest.raises(ObjectStoreError):
+        apply_delta(b"short", delta)
+
+
+@pytest.fixture
+def git_repo(fp, tmp_path, monkeypatch):
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    fp.allow_unregistered(True)
+    fp.pass_command([fp.any()])
+    # GitVCS writes rename limits to the global config
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+
+    def git(*args):
+        return subprocess.run(
+            ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com"]
+            + list(args),
+            cwd=repo_dir,
+            check=True,
+            capture_output=True,
+        ).stdout.decode("utf-8")
+
+    git("init", "-q")
+    for name in ("README.md", "src/main.py", "src/ü dir/file.txt", 'odd "name".txt'):
+        path = repo_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"{name}\n" * 50)
+    git("add", ".")
+    git("commit", "-q", "-m", "Initial commit")
+    (repo_dir / "src" / "main.py").write_text("changed\n" + "src/main.py\n" * 50)
+    git("commit", "-q", "-a", "-m", "Second commit")
+    git("tag", "-a", "v1", "-m", "Release", "HEAD~1")
+    return repo_dir, git
+
+
+def test_object_store_ls_tree(git_repo):
+    repo_dir, git = git_repo
+    expected = git("ls-tree", "--name-only", "-r", "HEAD").splitlines()
+
+    for gc in (False, True):
+        if gc:
+            # Second pass reads the same trees from a pack with deltas
+            git("gc", "-q", "--aggressive")
+        with ObjectStore(find_git_dir(repo_dir)) as store:
+            assert store.ls_tree_names("HEAD") == expected
+            assert store.ls_tree_names("v1") == expected
+            assert (
+                store.blob_id("HEAD", "src/main.py")
+                == git("rev-parse", "HEAD:src/main.py").strip()
+            )
+            assert store.blob_id("HEAD", "src") is None
+            assert store.blob_id("HEAD", "missing.txt") is None
+            with pytest.raises(ObjectStoreError):
+                store.ls_tree_names("HEAD~1")
+            with pytest.raises(ObjectStoreError):
+                store.read("0" * 40)
+
+
+def test_git_vcs_native_file_tree(git_repo):
+    repo_dir, git = git_repo
+    expected = [
+        line.strip() for line in git("ls-tree", "--name-only", "-r", "v1").splitlines()
+    ]
+    vcs = GitVCS(repo_dir=repo_dir, native_odb=True)
+    try:
+        assert vcs.file_tree(branch="v1") == expected
+        assert vcs.object_store is not None
+        # Revision expressions are answered by git
+        assert vcs.file_tree(branch="HEAD~1") == expected
+    finally:
+        vcs.close()
@@ -270,6 +270,37 @@ def test_git_process_log(fp):
     assert result == FAKE_LOG_OUTPUT
 
 
+def test_git_process_log_z(fp):
+    git_process = GitProcess()
+    fp.register(
+        [
+            "git",
+            "log",
+            "-n",
+            "4",
+            "--abbrev=40",
+            "--full-diff",
+            "--full-index",
+            "-z",
+            "--reverse",
+            "--raw",
+            "--numstat",
+            '--pretty=format:"%x00%x00COMMIT%x00'
+            "%H%x00%T%x00%aI%x00"
+            "%an%x00%ae%x00%aI%x00"
+            "%cn%x00%ce%x00%cI%x00"
+            '%s%x00%P%x00"',
+            "main",
+        ],
+        stdout=b"\x00\x00COMMIT\x00",
+    )
+
+    result = git_process.log_z(rev="main", number=4, patch=False)
+
+    assert type(result) is bytes
+    assert result == b"\x00\x00COMMIT\x00"
+
+
 def test_git_process_ls_files(fp):
     git_process = GitProcess()
     fp.register(
@@ -296,6 +327,27 @@ def test_git_process_ls_files(fp):
         result = git_process.ls_files(rev="dev")
 
 
+def test_git_process_submodule_paths(fp, tmp_path):
+    git_process = GitProcess(tmp_path)
+    (tmp_path / "deps" / "sub_test_repo" / ".git").mkdir(parents=True)
+    (tmp_path / "deps" / "sub test repo 2").mkdir(parents=True)
+    (tmp_path / "deps" / "sub test repo 2" / ".git").write_text("gitdir: ../..")
+    fp.register(
+        ["git", "ls-files", "--stage", "-z"],
+        stdout=(
+            "100644 3f4b9e5bc6c3a2ad5b1e2a7c6b9f0a4e8d1c2b3a 0\t.gitmodules\0"
+            "160000 27d9aaff69ac8db9d19918c4d5efb6b3ed2c3210 0\tdeps/sub_test_repo\0"
+            "160000 0cd26c4deaebd98ff26b8cf20bda15553ef5bdcd 0\tdeps/sub test repo 2\0"
+            "160000 39c54991d3cd7f4bae68d6b58549e7e2ab084a23 0\tdeps/not_checked_out\0"
+            "100644 8a6e3b0bc6c3a2ad5b1e2a7c6b9f0a4e8d1c2b3a 0\tREADME.md\0"
+        ),
+    )
+    assert git_process.submodule_paths() == [
+        "deps/sub_test_repo",
+        "deps/sub test repo 2",
+    ]
+
+
 def test_git_process_foreach_submodules_ls_files(fp):
     git_process = GitSubmoduleProcess()
     # git_process = GitProcess()
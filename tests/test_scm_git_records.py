@@ -0,0 +1,66 @@
+import json
+
+from testbrain.contrib.scm.git.records import (
+    Commit,
+    CommitFile,
+    Person,
+    commits_to_records,
+)
+from testbrain.contrib.scm.git.utils import make_parent_commit, parse_commits_from_text
+
+FAKE_LOG_OUTPUT = (
+    "COMMIT:\t39c54991d3cd7f4bae68d6b58549e7e2ab084a23\n"
+    "TREE:\t5c86012497523e000b3ddfd9a95967da58d77fe9\n"
+    "DATE:\t2023-10-02T13:23:02+03:00\n"
+    "AUTHOR:\tArtem Demidenko\tar.demidenko@gmail.com\t2023-10-02T13:23:02+03:00\n"
+    "COMMITTER:\tArtem Demidenko\tar.demidenko@gmail.com\t2023-10-02T13:23:02+03:00\n"
+    "MESSAGE:\tCONTRIB rename\n"
+    "PARENTS:\t5355a13f5ba44d23de9a3090ad976d63d1a60e3e\n"
+    "\n"
+    ":100644 100644 d5d8d4c6e0fd6a8e5cd5f8a2d7bba2a1e5c3bc2b "
+    "d5d8d4c6e0fd6a8e5cd5f8a2d7bba2a1e5c3bc2b R100\tCONTRIBUTING.md\tCONTRIB.md\n"
+    ":100644 100644 9d0a6c9c8d1c0dd2b1e2b2b5e71e4bca8e0bb9ac "
+    "5d3f1e6b3e0a7a2e2c87b2c1b7d6c0d0a5a6f4b1 M\tREADME.md\n"
+    "0\t0\tCONTRIBUTING.md => CONTRIB.md\n"
+    "2\t1\tREADME.md\n"
+)
+
+
+def test_commit_file_counters():
+    commit_file = CommitFile("src/main.py", insertions=3, deletions=2)
+    assert commit_file.additions == 3
+    assert commit_file.changes == 5
+    assert commit_file.lines == 5
+    assert commit_file.status is CommitFile("other.py").status
+    assert list(commit_file.to_dict()) == [
+        "filename",
+        "sha",
+        "additions",
+        "insertions",
+        "deletions",
+        "changes",
+        "lines",
+        "status",
+        "previous_filename",
+        "patch",
+        "blame",
+    ]
+
+
+def test_commit_to_dict_round_trip():
+    commits = parse_commits_from_text(FAKE_LOG_OUTPUT)
+    parent = make_parent_commit(commits[0])
+    parent["sha"] = "5355a13f5ba44d23de9a3090ad976d63d1a60e3e"
+    commits[0]["parents"] = [parent]
+
+    records = commits_to_records(commits)
+    assert json.dumps([record.to_dict() for record in records]) == json.dumps(commits)
+
+    record = records[0]
+    assert isinstance(record.author, Person)
+    assert isinstance(record.parents[0], Commit)
+    assert record.parent_shas == ["5355a13f5ba44d23de9a3090ad976d63d1a60e3e"]
+    assert [file.status for file in record.files] == ["renamed", "modified"]
+    assert record.files[1].changes == 3
+    assert record.header().files == []
+    assert Commit.from_dict(record.to_dict()) == record
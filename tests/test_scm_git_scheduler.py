@@ -0,0 +1,70 @@
+import shutil
+import subprocess
+
+import pytest
+
+from testbrain.contrib.scm.exceptions import BranchNotFound
+from testbrain.contrib.scm.git.process import GitVCS
+from testbrain.contrib.scm.git.scheduler import SyncJob, SyncScheduler
+
+
+@pytest.fixture
+def git_repos(fp, tmp_path, monkeypatch):
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    fp.allow_unregistered(True)
+    fp.pass_command([fp.any()])
+    # GitVCS writes rename limits to the global config
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+
+    repo_dirs = []
+    for index in range(3):
+        repo_dir = tmp_path / f"repo{index}"
+        repo_dir.mkdir()
+
+        def git(*args):
+            subprocess.run(
+                ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com"]
+                + list(args),
+                cwd=repo_dir,
+                check=True,
+                capture_output=True,
+            )
+
+        git("init", "-q", "-b", "main")
+        for number in range(index + 2):
+            (repo_dir / f"file{number}.txt").write_text(f"{number}\n")
+            git("add", ".")
+            git("commit", "-q", "-m", f"Commit {number}")
+        repo_dirs.append(repo_dir)
+    return repo_dirs
+
+
+@pytest.mark.parametrize("parse_pool_threshold", [0, 1024 * 1024])
+def test_sync_scheduler(git_repos, parse_pool_threshold):
+    scheduler = SyncScheduler(
+        stage_limits={"commits": 2, "parse": 2},
+        fetch=False,
+        parse_pool_threshold=parse_pool_threshold,
+    )
+    jobs = [(repo_dir, "main", 10) for repo_dir in git_repos]
+    jobs.append(SyncJob(git_repos[0], "missing"))
+    results = scheduler.run(jobs)
+
+    assert [result.job.repo_dir for result in results] == [
+        *git_repos,
+        git_repos[0],
+    ]
+    for result in results[:3]:
+        assert result.ok
+        assert result.commits == GitVCS(result.job.repo_dir).commits("main", 10)
+        assert result.file_tree == GitVCS(result.job.repo_dir).file_tree("main")
+        assert set(result.timings) == {"commits", "parse", "file_tree", "total"}
+
+    failed = results[3]
+    assert not failed.ok
+    assert isinstance(failed.error, BranchNotFound)
+    assert failed.commits is None
+    assert "total" in failed.timings
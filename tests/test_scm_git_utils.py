@@ -208,6 +208,137 @@ def test_parse_single_commit():
     #     ]
 
 
+def test_parse_commits_from_lines():
+    commits_raw = (
+        "\n"
+        "COMMIT:\t39c54991d3cd7f4bae68d6b58549e7e2ab084a23\n"
+        "TREE:\t5c86012497523e000b3ddfd9a95967da58d77fe9\n"
+        "DATE:\t2023-10-02T13:23:02+03:00\n"
+        "AUTHOR:\tArtem Demidenko\tar.demidenko@gmail.com\t2023-10-02T13:23:02+03:00\n"
+        "COMMITTER:\tArtem Demidenko\tar.demidenko@gmail.com\t2023-10-02T13:23:02+03:00\n"
+        "MESSAGE:\tRenamed files\n"
+        "PARENTS:\t5355a13f5ba44d23de9a3090ad976d63d1a60e3e\n\n"
+        "1\t0\tREADME.md\n"
+        "\n"
+        "diff --git a/README.md b/README.md\n"
+        "new file mode 100644\n"
+        "index 0000000000000000000000000000000000000000.."
+        "52da238091fabcd84e921bb6029d9addf9afd02f\n"
+        "--- /dev/null\n+++ b/README.md\n"
+        "@@ -0,0 +1 @@\n+# README\n\\ No newline at end of file\n"
+        "\n"
+        "COMMIT:\tceff1b9d2d403e83b9c7c39e5baa47eff61a3524\n"
+        "TREE:\tb6f23611cb888a619940c71582de2dad6e04cd42\n"
+        "DATE:\t2023-10-02T13:44:07+03:00\n"
+        "AUTHOR:\tArtem Demidenko\tar.demidenko@gmail.com\t2023-10-02T13:44:07+03:00\n"
+        "COMMITTER:\tArtem Demidenko\tar.demidenko@gmail.com\t2023-10-02T13:44:07+03:00\n"
+        "MESSAGE:\tCONTRIB rename\n"
+        "PARENTS:\t39c54991d3cd7f4bae68d6b58549e7e2ab084a23\n\n"
+        "2\t1\tREADME.md\n"
+        "\n"
+        "diff --git a/README.md b/README.md\n"
+        "index 52da238091fabcd84e921bb6029d9addf9afd02f.."
+        "78f497a48b0b909b166245a15c8d8e8ccacc9914 100644\n"
+        "--- a/README.md\n+++ b/README.md\n"
+        "@@ -1 +1,2 @@\n-# README\n\\ No newline at end of file\n"
+        "+# README\n+## New headline\n\\ No newline at end of file\n"
+    )
+    lines = commits_raw.encode("utf-8").splitlines(keepends=True)
+
+    result = list(git_utils.parse_commits_from_lines(iter(lines)))
+
+    assert result == git_utils.parse_commits_from_text(text=commits_raw.strip())
+    assert [commit["sha"] for commit in result] == [
+        "39c54991d3cd7f4bae68d6b58549e7e2ab084a23",
+        "ceff1b9d2d403e83b9c7c39e5baa47eff61a3524",
+    ]
+
+
+def test_parse_commit_record():
+    commit_raw = (
+        "COMMIT:\t912c4f149e6415e0bfcbe46b5eefd563abd15ab8\n"
+        "TREE:\tb6f23611cb888a619940c71582de2dad6e04cd42\n"
+        "DATE:\t2023-10-02T13:44:07+03:00\n"
+        "AUTHOR:\tArtem Demidenko\tar.demidenko@gmail.com\t2023-10-02T13:44:07+03:00\n"
+        "COMMITTER:\tArtem Demidenko\tar.demidenko@gmail.com\t2023-10-02T13:44:07+03:00\n"
+        "MESSAGE:\tAdd binary\n"
+        "PARENTS:\t39c54991d3cd7f4bae68d6b58549e7e2ab084a23\n"
+        "\n"
+        ":000000 100644 0000000000000000000000000000000000000000 "
+        "8352675d67aed6625ece79af41c27fdb4ee2e867 A\tbin.dat\n"
+        ":100644 100644 7cb38a976dd950aef3eee5e8a63c334100d7044b "
+        "7b2014660cadcd1abd84890b72177c7a35402b11 M\tREADME.md\n"
+        "-\t-\tbin.dat\n"
+        "1\t0\tREADME.md\n"
+        "\n"
+        "diff --git a/bin.dat b/bin.dat\n"
+        "new file mode 100644\n"
+        "index 0000000000000000000000000000000000000000.."
+        "8352675d67aed6625ece79af41c27fdb4ee2e867\n"
+        "Binary files /dev/null and b/bin.dat differ\n"
+        "diff --git a/README.md b/README.md\n"
+        "index 7cb38a976dd950aef3eee5e8a63c334100d7044b.."
+        "7b2014660cadcd1abd84890b72177c7a35402b11 100644\n"
+        "--- a/README.md\n+++ b/README.md\n"
+        "@@ -1 +1,2 @@\n # README\n+## New headline\n"
+    )
+
+    commit_dict = git_utils.parse_commit_record(commit_raw)
+
+    assert commit_dict["sha"] == "912c4f149e6415e0bfcbe46b5eefd563abd15ab8"
+    assert commit_dict["parents"] == "39c54991d3cd7f4bae68d6b58549e7e2ab084a23"
+    assert commit_dict["raw"].count("\n") == 2
+    assert commit_dict["numstats"] == "-\t-\tbin.dat\n1\t0\tREADME.md\n"
+    assert commit_dict["patch"].startswith("diff --git a/bin.dat b/bin.dat\n")
+
+    commit = git_utils.parse_single_commit(commit_dict)
+    assert [(file["filename"], file["status"]) for file in commit["files"]] == [
+        ("bin.dat", "added"),
+        ("README.md", "modified"),
+    ]
+
+    assert git_utils.parse_commit_record("COMMIT:\tbroken\nDATE:\t\n") is None
+
+
+def test_parse_commits_from_bytes():
+    output = (
+        b"\x00\x00COMMIT\x001ce5006b13378e1364132da41e20ccc4c30cc7e9"
+        b"\x007a25f86d9cee300932b1b715572a41940d356885"
+        b"\x002026-10-18T09:11:33+00:00"
+        b"\x00Tab\tName\x00a@b.c\x002026-10-18T09:11:33+00:00"
+        b"\x00Tab\tName\x00a@b.c\x002026-10-18T09:11:33+00:00"
+        b"\x00tab author\x002c476548dcd933174f797a247441316240865648\x00\n"
+        b":000000 100644 0000000000000000000000000000000000000000 "
+        b'bca70f35318f31dd1d1d1d2d2e64c19b880899ff A\x00we"ird\tname.txt\x00'
+        b'1\t0\twe"ird\tname.txt\x00'
+        b"\x00\x00\x00COMMIT\x002c476548dcd933174f797a247441316240865648"
+        b"\x00b914bcf4e6751a02c933b35bb8327da7a8abd7ef"
+        b"\x002026-10-18T09:04:37+00:00"
+        b"\x00Tester\x00a@b.c\x002026-10-18T09:04:37+00:00"
+        b"\x00Tester\x00a@b.c\x002026-10-18T09:04:37+00:00"
+        b"\x00Initial\x00\x00"
+    )
+
+    commits = git_utils.parse_commits_from_bytes(output)
+
+    assert len(commits) == 2
+    assert commits[0]["author"] == {
+        "name": "Tab\tName",
+        "email": "a@b.c",
+        "date": "2026-10-18T09:11:33+00:00",
+    }
+    assert commits[0]["parents"] == [
+        {"sha": "2c476548dcd933174f797a247441316240865648"}
+    ]
+    assert commits[0]["files"][0]["filename"] == 'we"ird\tname.txt'
+    assert commits[0]["files"][0]["status"] == "added"
+    assert commits[0]["files"][0]["sha"] == "bca70f35318f31dd1d1d1d2d2e64c19b880899ff"
+    assert commits[0]["files"][0]["additions"] == 1
+    assert commits[1]["message"] == "Initial"
+    assert commits[1]["parents"] == []
+    assert commits[1]["files"] == []
+
+
 def test_parse_foreach_submodules_commits():
     submodules_commits = (
         "Entering 'deps/sub_test_repo'\n\n"
@@ -246,3 +377,184 @@ def test_parse_foreach_submodules_file_list():
     )
     result = git_utils.parse_files_foreach_submodules(output)
     assert len(result) == 5
+
+
+def test_commit_index():
+    first = {"sha": "a" * 40, "message": "first"}
+    second = {"sha": "b" * 40, "message": "second"}
+    index = git_utils.CommitIndex([first])
+    index.append(second)
+
+    assert index == [first, second]
+    assert index[0] is first
+    assert index["b" * 40] is second
+    assert "a" * 40 in index
+    assert index.get("c" * 40) is None
+    assert git_utils.find_commit_by_sha(index, "b" * 40) is second
+    with pytest.raises(KeyError):
+        index["c" * 40]
+
+    # Duplicates keep the first commit, removal updates the index
+    index.append({"sha": "a" * 40, "message": "duplicate"})
+    assert index["a" * 40] is first
+    index.remove(first)
+    assert index["a" * 40]["message"] == "duplicate"
+    del index[-1]
+    assert "a" * 40 not in index
+    assert [commit["sha"] for commit in index] == ["b" * 40]
+
+
+def test_parse_patches_from_diff_tree():
+    output = (
+        "39c54991d3cd7f4bae68d6b58549e7e2ab084a23\n"
+        "diff --git a/README.md b/README.md\n"
+        "new file mode 100644\n"
+        "index 0000000000000000000000000000000000000000.."
+        "52da238091fabcd84e921bb6029d9addf9afd02f\n"
+        "--- /dev/null\n+++ b/README.md\n"
+        "@@ -0,0 +1 @@\n+# README\n\\ No newline at end of file\n"
+        "2c5ebc4c21b8db4917c9a30173e3f5307f8552f9\n"
+        "diff --git a/CONTRIB.md b/CONTRIB.md\n"
+        "index 7cb38a976dd950aef3eee5e8a63c334100d7044b.."
+        "7b2014660cadcd1abd84890b72177c7a35402b11 100644\n"
+        "--- a/CONTRIB.md\n+++ b/CONTRIB.md\n"
+        "@@ -1 +1 @@\n-Other\n+Another one\n"
+    )
+    patches = git_utils.parse_patches_from_diff_tree(
+        output,
+        shas=[
+            "39c54991d3cd7f4bae68d6b58549e7e2ab084a23",
+            "2c5ebc4c21b8db4917c9a30173e3f5307f8552f9",
+        ],
+    )
+    assert patches == {
+        "39c54991d3cd7f4bae68d6b58549e7e2ab084a23": {
+            "README.md": "@@ -0,0 +1 @@\n+# README\n\\ No newline at end of file\n"
+        },
+        "2c5ebc4c21b8db4917c9a30173e3f5307f8552f9": {
+            "CONTRIB.md": "@@ -1 +1 @@\n-Other\n+Another one\n"
+        },
+    }
+
+
+def test_parse_stats_from_text():
+    stats = git_utils.parse_stats_from_text(
+        "3\t1\tsrc/main.py\n"
+        "0\t0\tsrc/{old => new}/module.py\n"
+        "-\t-\tdocs/logo.png\n"
+        "2\t2\tREADME.md => README.rst\n"
+        "1\t0\t{ => lib}/util.py\n"
+    )
+    assert list(stats["files"]) == [
+        "src/main.py",
+        "src/new/module.py",
+        "docs/logo.png",
+        "README.rst",
+        "lib/util.py",
+    ]
+    assert stats["files"]["src/main.py"]["changes"] == 4
+    assert stats["files"]["docs/logo.png"]["insertions"] == 0
+    assert stats["total"] == {
+        "additions": 6,
+        "insertions": 6,
+        "deletions": 3,
+        "changes": 9,
+        "lines": 9,
+        "files": 5,
+        "total": 9,
+    }
+    assert git_utils.parse_stats_from_text("")["total"]["files"] == 0
+    with pytest.raises(ValueError):
+        git_utils.parse_stats_from_text("3\tsrc/main.py\n")
+
+
+FAKE_PATCH = (
+    "diff --git a/src/old.py b/src/new.py\n"
+    "similarity index 90%\n"
+    "rename from src/old.py\n"
+    "rename to src/new.py\n"
+    "index 1111111111111111111111111111111111111111..2222222222222222222222222222222222222222 100644\n"
+    "--- a/src/old.py\n"
+    "+++ b/src/new.py\n"
+    "@@ -1 +1 @@\n"
+    "-old\n"
+    "+new\n"
+    "diff --git a/README.md b/README.md\n"
+    "new file mode 100644\n"
+    "index 0000000000000000000000000000000000000000..3333333333333333333333333333333333333333\n"
+    "--- /dev/null\n"
+    "+++ b/README.md\n"
+    "@@ -0,0 +1 @@\n"
+    "+# Привет\n"
+)
+
+
+def test_scan_patch_headers():
+    headers = list(git_utils.scan_patch_headers(FAKE_PATCH))
+    assert [(start, FAKE_PATCH[end : end + 10]) for start, end, _ in headers] == [
+        (0, "similarity"),
+        (FAKE_PATCH.index("diff --git a/README.md"), "@@ -0,0 +1"),
+    ]
+    # Same captures as RE_COMMIT_DIFF, from text and from raw bytes
+    expected = [
+        match.groups() for match in git_patterns.RE_COMMIT_DIFF.finditer(FAKE_PATCH)
+    ]
+    assert [groups for _, _, groups in headers] == expected
+    assert [
+        groups
+        for _, _, groups in git_utils.scan_patch_headers(FAKE_PATCH.encode("utf-8"))
+    ] == expected
+
+
+def test_diff_from_patch_bytes():
+    diffs = git_utils.Diff.from_patch(FAKE_PATCH.encode("utf-8"))
+    text_diffs = git_utils.Diff.from_patch(FAKE_PATCH)
+    assert [diff.b_path for diff in diffs] == ["src/new.py", "README.md"]
+    assert diffs[1]._diff_span is not None
+    assert diffs[1].diff == "@@ -0,0 +1 @@\n+# Привет\n"
+    assert diffs[1]._diff_span is None
+    assert diffs == text_diffs
+
+
+def test_parse_commits_patch_limits():
+    text = (
+        "COMMIT:\t39c54991d3cd7f4bae68d6b58549e7e2ab084a23\n"
+        "TREE:\t5c86012497523e000b3ddfd9a95967da58d77fe9\n"
+        "DATE:\t2023-10-02T13:23:02+03:00\n"
+        "AUTHOR:\tTest\ttest@example.com\t2023-10-02T13:23:02+03:00\n"
+        "COMMITTER:\tTest\ttest@example.com\t2023-10-02T13:23:02+03:00\n"
+        "MESSAGE:\tUpdate\n"
+        "PARENTS:\t\n"
+        "\n"
+        "3\t0\tbig.txt\n"
+        "-\t-\tlogo.png\n"
+        "1\t0\tsmall.txt\n"
+        "\n"
+        + FAKE_PATCH.replace("src/old.py", "big.txt")
+        .replace("src/new.py", "big.txt")
+        .replace("README.md", "small.txt")
+        + "diff --git a/logo.png b/logo.png\n"
+        "new file mode 100644\n"
+        "index 0000000000000000000000000000000000000000..4444444444444444444444444444444444444444\n"
+        "Binary files /dev/null and b/logo.png differ\n"
+    )
+    patches = {
+        file["filename"]: file["patch"]
+        for file in git_utils.parse_commits_from_text(text)[0]["files"]
+    }
+    assert patches["logo.png"] == "Binary files /dev/null and b/logo.png differ\n"
+
+    limits = git_utils.PatchLimits(max_file_size=30, skip_binary=True)
+    commit = git_utils.parse_commits_from_text(text, limits=limits)[0]
+    limited = {file["filename"]: file["patch"] for file in commit["files"]}
+    size = len(patches["big.txt"].encode("utf-8"))
+    assert limited["big.txt"] == f"<patch omitted: file limit, {size} bytes>"
+    assert limited["small.txt"] == patches["small.txt"]
+    binary_size = len(patches["logo.png"])
+    assert limited["logo.png"] == f"<patch omitted: binary, {binary_size} bytes>"
+
+    limits = git_utils.PatchLimits(max_commit_size=size)
+    commit = git_utils.parse_commits_from_text(text, limits=limits)[0]
+    limited = {file["filename"]: file["patch"] for file in commit["files"]}
+    assert limited["big.txt"] == patches["big.txt"]
+    assert limited["small.txt"].startswith("<patch omitted: commit limit")
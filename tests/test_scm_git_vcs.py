@@ -3,6 +3,8 @@ import typing as t
 
 import pytest
 
+from testbrain.contrib.scm.git.cache import SyncState
+from testbrain.contrib.scm.git.catfile import GitCatFile, GitObject
 from testbrain.contrib.scm.git.process import GitVCS
 from testbrain.contrib.scm.exceptions import (
     ProcessError,
@@ -85,6 +87,44 @@ FAKE_LOG_OUTPUT = (
     "+# README\n+## New headline\n\\ No newline at end of file"
 )
 
+FAKE_PARENT_OBJECTS = [
+    (
+        "27d9aaff69ac8db9d19918c4d5efb6b3ed2c3210",
+        b"tree 4a8ad1bd1ef4c4bd06b4c1a0b3d3b0a8d1f34e36\n"
+        b"author Artem Demidenko <ar.demidenko@gmail.com> 1695993001 +0300\n"
+        b"committer Artem Demidenko <ar.demidenko@gmail.com> 1695993001 +0300\n"
+        b"\n"
+        b"Initial commit\n",
+    ),
+    (
+        "0cd26c4deaebd98ff26b8cf20bda15553ef5bdcd",
+        b"tree 9a3c9e0e3c2e4a8a0ccd0c8e5b4e1a0b1cf2b7d1\n"
+        b"parent 27d9aaff69ac8db9d19918c4d5efb6b3ed2c3210\n"
+        b"author Artem Demidenko <ar.demidenko@gmail.com> 1695993150 +0300\n"
+        b"committer Artem Demidenko <ar.demidenko@gmail.com> 1695993150 +0300\n"
+        b"\n"
+        b"Dev changes\n",
+    ),
+]
+
+
+def fake_cat_file_read(self, rev):
+    for sha, data in FAKE_PARENT_OBJECTS:
+        if sha == rev:
+            return GitObject(sha=sha, type="commit", size=len(data), data=data)
+    return None
+
+
+PRETTY_FORMAT_ARG = (
+    '--pretty=format:"%n'
+    "COMMIT:%x09%H%n"
+    "TREE:%x09%T%n"
+    "DATE:%x09%aI%n"
+    "AUTHOR:%x09%an%x09%ae%x09%aI%n"
+    "COMMITTER:%x09%cn%x09%ce%x09%cI%n"
+    'MESSAGE:%x09%s%nPARENTS:%x09%P%n"'
+)
+
 
 def register_limits(fp):
     limit = 999999
@@ -217,6 +257,260 @@ def test_git_vcs_commits(fp):
     ...
 
 
+def test_git_vcs_commits_parents(fp, monkeypatch):
+    register_limits(fp)
+    fp.register(
+        [
+            "git",
+            "log",
+            "-n",
+            "4",
+            "--abbrev=40",
+            "--full-diff",
+            "--full-index",
+            "--reverse",
+            "--raw",
+            "--numstat",
+            "-p",
+            PRETTY_FORMAT_ARG,
+            "main",
+        ],
+        stdout=FAKE_LOG_OUTPUT,
+    )
+    monkeypatch.setattr(GitCatFile, "read", fake_cat_file_read)
+    git_vcs = GitVCS()
+    commits = git_vcs.commits(commit="main", number=4)
+
+    assert len(commits) == 4
+    # Parents outside the requested window are read through cat-file
+    assert fp.call_count(["git", "log", fp.any()]) == 1
+
+    merge_parents = commits[0]["parents"]
+    assert [parent["sha"] for parent in merge_parents] == [
+        "27d9aaff69ac8db9d19918c4d5efb6b3ed2c3210",
+        "0cd26c4deaebd98ff26b8cf20bda15553ef5bdcd",
+    ]
+    assert merge_parents[0]["message"] == "Initial commit"
+    assert merge_parents[0]["date"] == "2023-09-29T16:10:01+03:00"
+    assert merge_parents[1]["parents"] == [
+        {"sha": "27d9aaff69ac8db9d19918c4d5efb6b3ed2c3210"}
+    ]
+
+    # Parents inside the window are taken from the same log output
+    parent = commits[1]["parents"][0]
+    assert parent["sha"] == "5355a13f5ba44d23de9a3090ad976d63d1a60e3e"
+    assert parent["message"] == "Merge branch 'dev'"
+    assert parent["files"] == []
+    assert parent["parents"] == [
+        {"sha": "27d9aaff69ac8db9d19918c4d5efb6b3ed2c3210"},
+        {"sha": "0cd26c4deaebd98ff26b8cf20bda15553ef5bdcd"},
+    ]
+
+
 @pytest.mark.skip(reason="no way of currently testing this")
 def test_git_vcs_file_tree(fp):
     ...
+
+
+def test_git_vcs_iter_commits(fp, monkeypatch):
+    register_limits(fp)
+    log_params = [
+        "-n",
+        "4",
+        "--abbrev=40",
+        "--full-diff",
+        "--full-index",
+        "--reverse",
+    ]
+    fp.register(
+        ["git", "log", *log_params, PRETTY_FORMAT_ARG, "main"],
+        stdout=FAKE_LOG_OUTPUT,
+    )
+    monkeypatch.setattr(GitCatFile, "read", fake_cat_file_read)
+    fp.register(
+        [
+            "git",
+            "log",
+            *log_params,
+            "--raw",
+            "--numstat",
+            "-p",
+            PRETTY_FORMAT_ARG,
+            "main",
+        ],
+        stdout=FAKE_LOG_OUTPUT,
+    )
+    git_vcs = GitVCS()
+    commits = git_vcs.iter_commits(commit="main", number=4)
+
+    first_commit = next(commits)
+    assert first_commit["sha"] == "5355a13f5ba44d23de9a3090ad976d63d1a60e3e"
+    assert len(first_commit["parents"]) == 2
+
+    rest_commits = list(commits)
+    assert len(rest_commits) == 3
+    assert rest_commits[-1]["parents"][0]["message"] == "CONTRIB rename"
+    assert [file["filename"] for file in rest_commits[-1]["files"]] == [
+        "CONTRIB.md",
+        "README.md",
+    ]
+
+
+def test_git_vcs_commits_cache(fp, monkeypatch, tmp_path):
+    register_limits(fp)
+    monkeypatch.setattr(GitCatFile, "read", fake_cat_file_read)
+    shas = [
+        "5355a13f5ba44d23de9a3090ad976d63d1a60e3e",
+        "39c54991d3cd7f4bae68d6b58549e7e2ab084a23",
+        "ceff1b9d2d403e83b9c7c39e5baa47eff61a3524",
+        "2c5ebc4c21b8db4917c9a30173e3f5307f8552f9",
+    ]
+    fp.register(["git", "rev-parse", "--absolute-git-dir"], stdout=str(tmp_path))
+    fp.register(
+        ["git", "rev-list", "-n", "4", "--reverse", "main"],
+        stdout="\n".join(shas),
+        occurrences=2,
+    )
+    fp.register(
+        [
+            "git",
+            "log",
+            "--no-walk=unsorted",
+            "--stdin",
+            "--abbrev=40",
+            "--full-diff",
+            "--full-index",
+            "--raw",
+            "--numstat",
+            "-p",
+            PRETTY_FORMAT_ARG,
+        ],
+        stdout=FAKE_LOG_OUTPUT,
+    )
+    git_vcs = GitVCS(cache=True)
+    commits = git_vcs.commits(commit="main", number=4)
+    assert [commit["sha"] for commit in commits] == shas
+    assert (tmp_path / "testbrain" / "commits.sqlite").exists()
+
+    # The second sync only lists the window, every commit comes from the cache
+    cached_commits = git_vcs.commits(commit="main", number=4)
+    assert fp.call_count(["git", "log", fp.any()]) == 1
+    assert [commit["sha"] for commit in cached_commits] == shas
+    assert [len(commit["parents"]) for commit in cached_commits] == [2, 1, 1, 1]
+    assert cached_commits[1]["files"] == commits[1]["files"]
+    git_vcs.close()
+
+
+def test_git_vcs_commits_since(fp, monkeypatch, tmp_path):
+    register_limits(fp)
+    monkeypatch.setattr(GitCatFile, "read", fake_cat_file_read)
+    monkeypatch.setattr(
+        GitCatFile, "info", lambda self, rev: GitObject(rev, "commit", 0)
+    )
+    last_sha = "27d9aaff69ac8db9d19918c4d5efb6b3ed2c3210"
+    fp.register(["git", "rev-parse", "--absolute-git-dir"], stdout=str(tmp_path))
+    fp.register(
+        [
+            "git",
+            "log",
+            "--abbrev=40",
+            "--full-diff",
+            "--full-index",
+            "--reverse",
+            "--raw",
+            "--numstat",
+            "-p",
+            PRETTY_FORMAT_ARG,
+            f"{last_sha}..main",
+        ],
+        stdout=FAKE_LOG_OUTPUT,
+    )
+    git_vcs = GitVCS()
+    assert git_vcs.get_last_commit_sha("main") is None
+
+    git_vcs.set_last_commit_sha("main", last_sha)
+    commits = git_vcs.commits_since(head="main", branch="main")
+
+    assert len(commits) == 4
+    assert SyncState.for_git_dir(tmp_path).get("main") == last_sha
+
+
+def test_git_vcs_file_tree_submodules(fp, tmp_path):
+    register_limits(fp)
+    for path in ("deps/sub_a", "deps/sub_b"):
+        (tmp_path / path / ".git").mkdir(parents=True)
+    fp.register(
+        ["git", "ls-tree", "--name-only", "-r", "main"],
+        stdout=".gitmodules\nREADME.md\ndeps/sub_a\ndeps/sub_b",
+    )
+    fp.register(
+        ["git", "ls-files", "--stage", "-z"],
+        stdout=(
+            "160000 27d9aaff69ac8db9d19918c4d5efb6b3ed2c3210 0\tdeps/sub_a\0"
+            "160000 0cd26c4deaebd98ff26b8cf20bda15553ef5bdcd 0\tdeps/sub_b\0"
+        ),
+    )
+    fp.register(
+        ["git", "ls-tree", "--name-only", "-r", "HEAD"],
+        stdout="README.md\nsrc/main.py\n",
+        occurrences=2,
+    )
+    git_vcs = GitVCS(repo_dir=tmp_path)
+    file_tree = git_vcs.file_tree(branch="main", submodules=True)
+
+    # Submodules are queried concurrently but merged in listing order
+    assert file_tree == [
+        ".gitmodules",
+        "README.md",
+        "deps/sub_a",
+        "deps/sub_b",
+        "deps/sub_a/README.md",
+        "deps/sub_a/src/main.py",
+        "deps/sub_b/README.md",
+        "deps/sub_b/src/main.py",
+    ]
+
+
+def test_git_vcs_commits_lazy_patch(fp, monkeypatch):
+    register_limits(fp)
+    monkeypatch.setattr(GitCatFile, "read", fake_cat_file_read)
+    fp.register(
+        [
+            "git",
+            "log",
+            "-n",
+            "4",
+            "--abbrev=40",
+            "--full-diff",
+            "--full-index",
+            "--reverse",
+            "--raw",
+            "--numstat",
+            PRETTY_FORMAT_ARG,
+            "main",
+        ],
+        stdout=FAKE_LOG_OUTPUT,
+    )
+    fp.register(
+        ["git", "diff-tree", "--stdin", "--root", "-p", "--full-index"],
+        stdout=(
+            "2c5ebc4c21b8db4917c9a30173e3f5307f8552f9\n"
+            "diff --git a/CONTRIB.md b/CONTRIB.md\n"
+            "index 7cb38a976dd950aef3eee5e8a63c334100d7044b.."
+            "7b2014660cadcd1abd84890b72177c7a35402b11 100644\n"
+            "--- a/CONTRIB.md\n+++ b/CONTRIB.md\n"
+            "@@ -1 +1,2 @@\n--- empty --\n\\ No newline at end of file\n"
+            "+-- empty --\n+Another one\n\\ No newline at end of file\n"
+        ),
+    )
+    git_vcs = GitVCS()
+    commits = git_vcs.commits(commit="main", number=4, lazy_patch=True)
+
+    assert fp.call_count(["git", "diff-tree", fp.any()]) == 0
+    last_files = commits[-1]["files"]
+    assert "patch" not in last_files[0]
+    assert last_files[0]["patch"].startswith("@@ -1 +1,2 @@\n")
+    # Every pending commit was loaded by the same call
+    assert commits[1]["files"][0].get("patch") == ""
+    assert last_files[1]["patch"] == ""
+    assert fp.call_count(["git", "diff-tree", fp.any()]) == 1
@@ -1,6 +1,9 @@
+import asyncio
 import pytest
 import subprocess
 
+from testbrain.contrib.terminal import AsyncProcess, Process, ProcessExecutionError
+
 
 def test_echo_null_byte(fp):
     fp.register(["echo", "-ne", "\x00"], stdout=bytes.fromhex("00"))
@@ -13,3 +16,47 @@ def test_echo_null_byte(fp):
 
     assert process.returncode == 0
     assert out == b"\x00"
+
+
+def test_process_stream(fp):
+    fp.register(["git", "log"], stdout=["first", "second", "third"])
+
+    process = Process()
+    lines = list(process.stream(["git", "log"]))
+
+    assert lines == [b"first\n", b"second\n", b"third\n"]
+
+
+def test_process_stream_error(fp):
+    fp.register(["git", "log"], stderr="fatal: bad revision", returncode=128)
+
+    process = Process()
+    with pytest.raises(ProcessExecutionError) as exc_info:
+        list(process.stream(["git", "log"]))
+
+    assert exc_info.value.returncode == 128
+    assert exc_info.value.stderr == b"fatal: bad revision"
+
+
+def test_async_process_execute(fp):
+    fp.register(["git", "rev-parse", "HEAD"], stdout="abc\n")
+    fp.register(["git", "rev-parse", "bad"], stderr="fatal: bad", returncode=128)
+
+    process = AsyncProcess()
+    assert asyncio.run(process.execute(["git", "rev-parse", "HEAD"])) == "abc"
+
+    with pytest.raises(ProcessExecutionError) as exc_info:
+        asyncio.run(process.execute(["git", "rev-parse", "bad"]))
+    assert exc_info.value.returncode == 128
+    assert exc_info.value.stderr == b"fatal: bad"
+
+
+def test_async_process_stream(fp):
+    fp.register(["git", "log"], stdout=["first", "second", "third"])
+
+    async def collect():
+        process = AsyncProcess()
+        process.chunk_size = 4
+        return [line async for line in process.stream(["git", "log"])]
+
+    assert asyncio.run(collect()) == [b"first\n", b"second\n", b"third\n"]